@@ -2,9 +2,10 @@
 hyperliquid adapter implementation
 """
 
+import asyncio
 import logging
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from .base import (
     BrokerAdapter,
@@ -37,45 +38,45 @@ class HyperliquidAdapter(BrokerAdapter):
 
     async def get_market_state(self, symbols: List[str]) -> MarketState:
         """fetch market data for all symbols"""
-        markets = []
-        for symbol in symbols:
-            try:
-                # get l2 book for best bid/ask
-                book = await self.hl_client.get_l2_book(symbol)
-                levels = book.get("levels", [[], []])
-                bids = levels[0] if len(levels) > 0 else []
-                asks = levels[1] if len(levels) > 1 else []
-
-                best_bid = float(bids[0]["px"]) if bids else 0.0
-                best_ask = float(asks[0]["px"]) if asks else 0.0
-                bid_qty = float(bids[0]["sz"]) if bids else 0.0
-                ask_qty = float(asks[0]["sz"]) if asks else 0.0
-
-                mark = (best_bid + best_ask) / 2 if best_bid > 0 and best_ask > 0 else 0.0
-                spread_bps = (
-                    ((best_ask - best_bid) / mark * 10000) if mark > 0 else 0.0
-                )
+        # symbols are fetched concurrently; failed ones are logged and skipped
+        results = await asyncio.gather(*(self._fetch_market(symbol) for symbol in symbols))
+        markets = [m for m in results if m is not None]
 
-                # get funding rate
-                funding_rate = await self.hl_client.get_funding_rate(symbol)
+        return MarketState(markets=markets, timestamp=datetime.utcnow().isoformat())
 
-                markets.append(
-                    MarketInfo(
-                        symbol=symbol,
-                        best_bid=best_bid,
-                        best_ask=best_ask,
-                        mark=mark,
-                        spread_bps=spread_bps,
-                        funding_8h_rate=funding_rate,
-                        volume_24h=0.0,  # hyperliquid doesn't provide this directly
-                        bid_qty=bid_qty,
-                        ask_qty=ask_qty,
-                    )
-                )
-            except Exception as e:
-                logger.error(f"failed to fetch market data for {symbol}: {e}")
+    async def _fetch_market(self, symbol: str) -> Optional[MarketInfo]:
+        """fetch book and funding for one symbol"""
+        try:
+            # l2 book for best bid/ask, plus funding rate
+            book, funding_rate = await self.hl_client.get_market_snapshot(symbol)
+            levels = book.get("levels", [[], []])
+            bids = levels[0] if len(levels) > 0 else []
+            asks = levels[1] if len(levels) > 1 else []
+
+            best_bid = float(bids[0]["px"]) if bids else 0.0
+            best_ask = float(asks[0]["px"]) if asks else 0.0
+            bid_qty = float(bids[0]["sz"]) if bids else 0.0
+            ask_qty = float(asks[0]["sz"]) if asks else 0.0
+
+            mark = (best_bid + best_ask) / 2 if best_bid > 0 and best_ask > 0 else 0.0
+            spread_bps = (
+                ((best_ask - best_bid) / mark * 10000) if mark > 0 else 0.0
+            )
 
-        return MarketState(markets=markets, timestamp=datetime.utcnow().isoformat())
+            return MarketInfo(
+                symbol=symbol,
+                best_bid=best_bid,
+                best_ask=best_ask,
+                mark=mark,
+                spread_bps=spread_bps,
+                funding_8h_rate=funding_rate,
+                volume_24h=0.0,  # hyperliquid doesn't provide this directly
+                bid_qty=bid_qty,
+                ask_qty=ask_qty,
+            )
+        except Exception as e:
+            logger.error(f"failed to fetch market data for {symbol}: {e}")
+            return None
 
     async def get_account_state(self) -> AccountState:
         """fetch account state from hyperliquid"""
@@ -204,29 +205,31 @@ class HyperliquidAdapter(BrokerAdapter):
         try:
             state = await self.hl_client.get_account_state()
 
-            # update positions
-            positions = state.get("assetPositions", [])
-            for pos_data in positions:
-                pos = pos_data["position"]
-                symbol = pos["coin"]
-                qty = float(pos["szi"])
-                avg_entry = float(pos["entryPx"])
-                unrealized_pl = float(pos["unrealizedPnl"])
-                # Retrieve exit plan from metadata
-                exit_plan = await self.db.get_metadata(f"exit_plan_{symbol}")
-                await self.db.upsert_position(symbol, qty, avg_entry, unrealized_pl, exit_plan)
-
-            # update equity snapshot
-            margin = state.get("marginSummary", {})
-            equity = float(margin.get("accountValue", 0))
-            total_margin_used = float(margin.get("totalMarginUsed", 0))
-            unrealized_pl = float(margin.get("totalNtlPos", 0))
-
-            # Calculate available cash (equity - used_margin) - same as worker sends to agent
-            available_cash = max(0.0, equity - total_margin_used)
-
-            ts = datetime.utcnow().replace(second=0, microsecond=0)
-            await self.db.insert_equity_snapshot(ts, equity, available_cash, unrealized_pl)
+            # one connection and one commit for all db writes below
+            async with self.db.transaction():
+                # update positions
+                positions = state.get("assetPositions", [])
+                for pos_data in positions:
+                    pos = pos_data["position"]
+                    symbol = pos["coin"]
+                    qty = float(pos["szi"])
+                    avg_entry = float(pos["entryPx"])
+                    unrealized_pl = float(pos["unrealizedPnl"])
+                    # Retrieve exit plan from metadata
+                    exit_plan = await self.db.get_metadata(f"exit_plan_{symbol}")
+                    await self.db.upsert_position(symbol, qty, avg_entry, unrealized_pl, exit_plan)
+
+                # update equity snapshot
+                margin = state.get("marginSummary", {})
+                equity = float(margin.get("accountValue", 0))
+                total_margin_used = float(margin.get("totalMarginUsed", 0))
+                unrealized_pl = float(margin.get("totalNtlPos", 0))
+
+                # Calculate available cash (equity - used_margin) - same as worker sends to agent
+                available_cash = max(0.0, equity - total_margin_used)
+
+                ts = datetime.utcnow().replace(second=0, microsecond=0)
+                await self.db.insert_equity_snapshot(ts, equity, available_cash, unrealized_pl)
 
             logger.info(f"reconciled: equity={equity:.2f}")
         except Exception as e:
@@ -217,42 +217,44 @@ class PerpSimAdapter(BrokerAdapter):
         called after each agent cycle.
         """
         try:
-            # update positions in db
-            for sym, pos in self.positions.items():
-                if pos.qty != 0:
-                    market = self.market_cache.get(sym)
-                    mark = market.mark if market else pos.avg_entry
-                    unrealized = (
-                        pos.qty * (mark - pos.avg_entry)
-                        if pos.qty > 0
-                        else abs(pos.qty) * (pos.avg_entry - mark)
-                    )
-                    # Retrieve exit plan from metadata
-                    exit_plan = await self.db.get_metadata(f"exit_plan_{sym}")
-                    await self.db.upsert_position(sym, pos.qty, pos.avg_entry, unrealized, exit_plan, pos.leverage)
-                else:
-                    await self.db.upsert_position(sym, 0, 0, 0, None, 1.0)
-
-            # insert equity snapshot
-            account = await self.get_account_state()
-
-            # Calculate available cash (equity - used_margin) - same as worker sends to agent
-            used_margin = 0.0
-            for pos in account.positions:
-                if pos.leverage and pos.leverage > 0:
-                    used_margin += pos.notional / pos.leverage
-
-            available_cash = max(0.0, account.equity - used_margin)
-
-            ts = datetime.utcnow().replace(second=0, microsecond=0)
-            await self.db.insert_equity_snapshot(
-                ts, account.equity, available_cash, account.unrealized_pl
-            )
+            # one connection and one commit for the whole reconcile
+            async with self.db.transaction():
+                # update positions in db
+                for sym, pos in self.positions.items():
+                    if pos.qty != 0:
+                        market = self.market_cache.get(sym)
+                        mark = market.mark if market else pos.avg_entry
+                        unrealized = (
+                            pos.qty * (mark - pos.avg_entry)
+                            if pos.qty > 0
+                            else abs(pos.qty) * (pos.avg_entry - mark)
+                        )
+                        # Retrieve exit plan from metadata
+                        exit_plan = await self.db.get_metadata(f"exit_plan_{sym}")
+                        await self.db.upsert_position(sym, pos.qty, pos.avg_entry, unrealized, exit_plan, pos.leverage)
+                    else:
+                        await self.db.upsert_position(sym, 0, 0, 0, None, 1.0)
+
+                # insert equity snapshot
+                account = await self.get_account_state()
+
+                # Calculate available cash (equity - used_margin) - same as worker sends to agent
+                used_margin = 0.0
+                for pos in account.positions:
+                    if pos.leverage and pos.leverage > 0:
+                        used_margin += pos.notional / pos.leverage
+
+                available_cash = max(0.0, account.equity - used_margin)
+
+                ts = datetime.utcnow().replace(second=0, microsecond=0)
+                await self.db.insert_equity_snapshot(
+                    ts, account.equity, available_cash, account.unrealized_pl
+                )
 
-            # update metadata
-            await self.db.set_metadata("sim_fees", self.cumulative_fees)
-            await self.db.set_metadata("sim_funding", self.cumulative_funding)
-            await self.db.set_metadata("sim_realized", account.realized_pl)
+                # update metadata
+                await self.db.set_metadata("sim_fees", self.cumulative_fees)
+                await self.db.set_metadata("sim_funding", self.cumulative_funding)
+                await self.db.set_metadata("sim_realized", account.realized_pl)
 
             logger.info(f"reconciled: equity={account.equity:.2f}, "
                        f"realized={account.realized_pl:.2f}, "
@@ -415,7 +417,7 @@ class PerpSimAdapter(BrokerAdapter):
             exit_reason = justification
 
         # record trade in db
-        await self.db.insert_trade(
+        inserted = await self.db.insert_trade(
             symbol=symbol,
             side=order.side,
             qty=order.qty,
@@ -426,6 +428,8 @@ class PerpSimAdapter(BrokerAdapter):
             entry_reason=entry_reason,
             exit_reason=exit_reason,
         )
+        if not inserted:
+            logger.warning(f"trade {order.client_id} already recorded, skipped duplicate insert")
 
         logger.info(
             f"filled: {order.side} {order.qty} {symbol} @ {fill_price:.2f}, "
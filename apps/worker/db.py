@@ -1,11 +1,121 @@
+"""
+async postgres access for the worker.
+
+indexes the heavier queries rely on (see db/migrations):
+- completed_trades(): idx_trades_symbol_ts, or idx_trades_version_symbol_ts with a version
+- sharpe / max drawdown / version rollup: idx_equity_ts, or idx_equity_version_ts with a version
+- get_trades: idx_trades_ts_id_covering
+"""
+import asyncio
 import asyncpg
-from typing import List, Dict, Optional
+import copy
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import functools
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
-import json
 import logging
+import math
+import time
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# seconds a get_metadata result is served from memory. this worker's own writes invalidate
+# it at once; writes from other processes (the api, admin scripts) show up within this window
+METADATA_CACHE_TTL = 30.0
+ANALYTICS_CACHE_TTL = 30.0  # seconds an analytics result is reused if nothing was written
+WRITE_BUFFER_DELAY = 1.0  # seconds buffered equity / chat rows wait before a flush
+WRITE_BUFFER_MAX = 500  # buffered rows that force an immediate flush
+
+_CHAT_COLUMNS = ["ts", "content", "cycle_id", "observation_prompt", "action_response"]
+
+
+# jsonb binary wire format is a version byte (1) followed by the json text,
+# so orjson's bytes go on and off the wire without a str round trip
+def _jsonb_encode(value) -> bytes:
+    # numpy scalars show up in computed metrics; stdlib json would reject them too
+    return b"\x01" + orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _jsonb_decode(data: bytes):
+    return orjson.loads(data[1:])
+
+
+# connection bound by Database.session() for the current task
+_session_conn: ContextVar[Optional[asyncpg.Connection]] = ContextVar("_session_conn", default=None)
+
+# hot write-path statements, prepared once per pool connection
+_STMTS = {
+    "insert_trade": """
+        insert into trades (ts, symbol, side, qty, price, fee, client_id, entry_reason, exit_reason)
+        values ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+        on conflict (client_id) do nothing
+        returning true
+    """,
+    "delete_position": "delete from positions where symbol = $1",
+    # entry_time / entry_justification reset only when the position flips direction
+    "upsert_position": """
+        insert into positions (symbol, qty, avg_entry, unrealized_pl, exit_plan, leverage, entry_time, entry_justification, updated_at)
+        values ($1, $2, $3, $4, $5, $6, now(), $7, now())
+        on conflict (symbol) do update set
+          qty = excluded.qty,
+          avg_entry = excluded.avg_entry,
+          unrealized_pl = excluded.unrealized_pl,
+          exit_plan = excluded.exit_plan,
+          leverage = excluded.leverage,
+          entry_time = case when positions.qty * excluded.qty < 0 then now() else positions.entry_time end,
+          entry_justification = case when positions.qty * excluded.qty < 0
+                                     then excluded.entry_justification
+                                     else positions.entry_justification end,
+          updated_at = now()
+    """,
+    "get_metadata": "select value from metadata where key = $1",
+    "get_metadata_many": "select key, value from metadata where key = any($1::text[])",
+    # a None value is stored as json null, not sql null
+    "set_metadata": """
+        insert into metadata (key, value, updated_at)
+        values ($1, coalesce($2, 'null'::jsonb), now())
+        on conflict (key) do update set value = excluded.value, updated_at = now()
+    """,
+}
+
+
+def _ttl_cached(ttl: float):
+    """
+    cache an async Database method's result per arguments for `ttl` seconds.
+    entries are tied to the instance's mutation generation, so Database._invalidate() drops them.
+    callers get a copy of the cached result, so mutating it doesn't leak into later hits.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            key = (fn.__name__, args, tuple(sorted((k, v) for k, v in kwargs.items() if k != "conn")))
+            gen = self._mutation_gen
+            hit = self._ttl_cache.get(key)
+            if hit is not None and hit[0] == gen and hit[1] > time.monotonic():
+                return copy.deepcopy(hit[2])
+            result = await fn(self, *args, **kwargs)
+            self._ttl_cache[key] = (gen, time.monotonic() + ttl, result)
+            return copy.deepcopy(result)
+        return wrapper
+    return decorator
+
+
+def _flushes_first(fn):
+    """write buffered equity / chat rows before fn reads (or tags) those tables"""
+    @functools.wraps(fn)
+    async def wrapper(self, *args, **kwargs):
+        await self.flush()
+        return await fn(self, *args, **kwargs)
+    return wrapper
+
+
+class _Connection(asyncpg.Connection):
+    """pool connection carrying its prepared hot statements"""
+
+    __slots__ = ("_stmts",)
+
 
 class Database:
     """async postgres client for agent state"""
@@ -13,337 +123,372 @@ class Database:
     def __init__(self, database_url: str):
         self.database_url = database_url
         self.pool: Optional[asyncpg.Pool] = None
+        self.analytics_pool: Optional[asyncpg.Pool] = None
+        self._last_prices: Dict[str, float] = {}  # last prices written to market_prices
+        self._metadata_cache: Dict[str, tuple] = {}  # key -> (expires_at, value)
+        self._ttl_cache: Dict[tuple, tuple] = {}  # see _ttl_cached
+        self._mutation_gen = 0  # bumped by writes that change analytics inputs
+        # write-behind buffers for equity snapshots and chat rows, see flush()
+        self._equity_buffer: List[Tuple[datetime, float, float, float]] = []
+        self._chat_buffer: List[tuple] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()  # a flush waits for one already writing
 
     async def connect(self):
         """create connection pool"""
         self.pool = await asyncpg.create_pool(
             self.database_url,
-            min_size=2,
-            max_size=10,
+            min_size=4,  # warm connections for the steady tick loop
+            max_size=16,
+            max_inactive_connection_lifetime=300,
             command_timeout=60,  # 60 second timeout for queries
+            # hot queries stay in the per-connection lru and never age out
+            statement_cache_size=1024,
+            max_cached_statement_lifetime=0,
             server_settings={
-                'statement_timeout': '60000'  # 60 second statement timeout (in ms)
-            }
+                'statement_timeout': '60000',  # 60 second statement timeout (in ms)
+                'application_name': 'ai-perp-worker',
+                # short oltp-style queries; jit compile time outweighs any gain
+                'jit': 'off',
+            },
+            connection_class=_Connection,
+            init=self._init_connection,
+        )
+        # heavy read-only analytics run unprepared so each call gets a plan for its
+        # actual parameters instead of a cached generic one
+        self.analytics_pool = await asyncpg.create_pool(
+            self.database_url,
+            min_size=1,
+            max_size=3,
+            command_timeout=60,
+            statement_cache_size=0,
+            max_inactive_connection_lifetime=300,
+            server_settings={
+                'statement_timeout': '60000',
+                'application_name': 'ai-perp-worker-analytics',
+                'jit': 'off',
+            },
         )
         logger.info("database pool created")
 
     async def close(self):
-        """close connection pool"""
+        """flush buffered writes, then close connection pools"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        if self.pool:
+            await self.flush()
+        if self.analytics_pool:
+            await self.analytics_pool.close()
         if self.pool:
             await self.pool.close()
             logger.info("database pool closed")
 
+    @staticmethod
+    async def _init_connection(conn: _Connection):
+        """per-connection setup: jsonb codec, then the prepared hot statements"""
+        # jsonb params take python objects and come back decoded
+        await conn.set_type_codec(
+            "jsonb", encoder=_jsonb_encode, decoder=_jsonb_decode, schema="pg_catalog", format="binary"
+        )
+        conn._stmts = {name: await conn.prepare(sql) for name, sql in _STMTS.items()}
+
+    @asynccontextmanager
+    async def session(self):
+        """bind one pool connection to the current task so nested db calls reuse it"""
+        if _session_conn.get() is not None:
+            yield
+            return
+        async with self.pool.acquire() as conn:
+            token = _session_conn.set(conn)
+            try:
+                yield
+            finally:
+                _session_conn.reset(token)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """session() plus one transaction, so a group of writes commits with a single flush"""
+        async with self.session():
+            async with _session_conn.get().transaction():
+                yield
+
+    @asynccontextmanager
+    async def _acquire(self, conn: Optional[asyncpg.Connection] = None, analytics: bool = False):
+        """yield the caller's or session connection if there is one, else a fresh pool connection"""
+        if conn is None:
+            conn = _session_conn.get()
+        if conn is not None:
+            yield conn
+        else:
+            pool = self.analytics_pool if analytics else self.pool
+            async with pool.acquire() as conn:
+                yield conn
+
+    def _invalidate(self):
+        """drop cached analytics after a write to trades, equity or versions"""
+        self._mutation_gen += 1
+
+    async def fan_out(self, coros):
+        """run independent db calls concurrently, each on its own pool connection"""
+        async def detached(coro):
+            # gather copies the caller's context; a shared session connection
+            # can't run concurrent queries
+            _session_conn.set(None)
+            return await coro
+
+        return await asyncio.gather(*(detached(c) for c in coros))
+
     async def insert_trade(
         self, symbol: str, side: str, qty: float, price: float, fee: float, client_id: str, ts: datetime,
         entry_reason: Optional[str] = None, exit_reason: Optional[str] = None
-    ):
-        """insert a filled trade"""
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                """
-                insert into trades (ts, symbol, side, qty, price, fee, client_id, entry_reason, exit_reason)
-                values ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                on conflict (client_id) do nothing
-                """,
+    ) -> bool:
+        """insert a filled trade; returns False if client_id was already recorded"""
+        async with self._acquire() as conn:
+            inserted = await conn._stmts["insert_trade"].fetchval(
                 ts, symbol, side, qty, price, fee, client_id, entry_reason, exit_reason,
             )
+        if inserted is None:
+            return False
+        self._invalidate()
+        return True
+
+    async def insert_trades_many(self, rows: List[Tuple]):
+        """
+        insert many filled trades in one pipelined batch.
+        rows are (ts, symbol, side, qty, price, fee, client_id, entry_reason, exit_reason);
+        duplicate client_ids are skipped as in insert_trade.
+        """
+        if not rows:
+            return
+        async with self._acquire() as conn:
+            await conn._stmts["insert_trade"].executemany(rows)
+        self._invalidate()
 
     async def upsert_position(self, symbol: str, qty: float, avg_entry: float, unrealized_pl: float, exit_plan: Optional[Dict] = None, leverage: float = 1.0, entry_justification: Optional[str] = None):
         """update or insert position"""
-        async with self.pool.acquire() as conn:
+        async with self._acquire() as conn:
             if qty == 0:
                 # close position
-                await conn.execute("delete from positions where symbol = $1", symbol)
-            else:
-                # Check if this is a new position or position direction change
-                existing = await conn.fetchrow("select qty, entry_time from positions where symbol = $1", symbol)
-
-                if existing is None:
-                    # New position - set entry_time and entry_justification
-                    await conn.execute(
-                        """
-                        insert into positions (symbol, qty, avg_entry, unrealized_pl, exit_plan, leverage, entry_time, entry_justification, updated_at)
-                        values ($1, $2, $3, $4, $5, $6, now(), $7, now())
-                        """,
-                        symbol, qty, avg_entry, unrealized_pl, json.dumps(exit_plan) if exit_plan else None, leverage, entry_justification,
-                    )
-                elif (existing['qty'] > 0 and qty < 0) or (existing['qty'] < 0 and qty > 0):
-                    # Direction change - reset entry_time and entry_justification
-                    await conn.execute(
-                        """
-                        update positions
-                        set qty = $2, avg_entry = $3, unrealized_pl = $4, exit_plan = $5, leverage = $6, entry_time = now(), entry_justification = $7, updated_at = now()
-                        where symbol = $1
-                        """,
-                        symbol, qty, avg_entry, unrealized_pl, json.dumps(exit_plan) if exit_plan else None, leverage, entry_justification,
-                    )
-                else:
-                    # Same direction - preserve entry_time and entry_justification
-                    await conn.execute(
-                        """
-                        update positions
-                        set qty = $2, avg_entry = $3, unrealized_pl = $4, exit_plan = $5, leverage = $6, updated_at = now()
-                        where symbol = $1
-                        """,
-                        symbol, qty, avg_entry, unrealized_pl, json.dumps(exit_plan) if exit_plan else None, leverage,
-                    )
+                await conn._stmts["delete_position"].fetchval(symbol)
+                return
 
-    async def get_positions(self) -> List[Dict]:
-        """fetch all open positions"""
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch("select symbol, qty, avg_entry, unrealized_pl, exit_plan, leverage, entry_time from positions")
-            result = []
-            for r in rows:
-                pos = dict(r)
-                # Parse exit_plan from JSON string to dict
-                if pos.get('exit_plan'):
-                    pos['exit_plan'] = json.loads(pos['exit_plan']) if isinstance(pos['exit_plan'], str) else pos['exit_plan']
-                result.append(pos)
-            return result
+            # new position, same-direction update and direction change in one statement
+            await conn._stmts["upsert_position"].fetchval(
+                symbol, qty, avg_entry, unrealized_pl, exit_plan or None, leverage, entry_justification,
+            )
+
+    async def get_positions(self, conn: Optional[asyncpg.Connection] = None) -> List[asyncpg.Record]:
+        """fetch all open positions as records (exit_plan arrives decoded by the jsonb codec)"""
+        async with self._acquire(conn) as conn:
+            return await conn.fetch("select symbol, qty, avg_entry, unrealized_pl, exit_plan, leverage, entry_time from positions")
 
     async def insert_equity_snapshot(self, ts: datetime, equity: float, cash: float, unrealized_pl: float):
-        """insert equity snapshot"""
-        async with self.pool.acquire() as conn:
+        """buffer an equity snapshot; written by the next flush()"""
+        self._equity_buffer.append((ts, equity, cash, unrealized_pl))
+        await self._buffered()
+
+    async def insert_equity_snapshots_bulk(self, rows: List[Tuple[datetime, float, float, float]]):
+        """bulk insert (ts, equity, cash, unrealized_pl) snapshots in one unnest upsert"""
+        # later rows win on duplicate ts, as repeated insert_equity_snapshot calls would
+        rows = list({r[0]: r for r in rows}.values())
+        if not rows:
+            return
+        # one array per column; no temp staging table, so this is safe inside an outer transaction
+        ts, equity, cash, unrealized_pl = zip(*rows)
+        async with self._acquire() as conn:
             await conn.execute(
                 """
                 insert into equity_snapshots (ts, equity, cash, unrealized_pl)
-                values ($1, $2, $3, $4)
-                on conflict (ts) do update set equity = $2, cash = $3, unrealized_pl = $4
+                select * from unnest($1::timestamptz[], $2::float8[], $3::float8[], $4::float8[])
+                on conflict (ts) do update set
+                  equity = excluded.equity, cash = excluded.cash, unrealized_pl = excluded.unrealized_pl
                 """,
                 ts, equity, cash, unrealized_pl,
             )
+        self._invalidate()
 
     async def insert_chat(self, ts: datetime, content: str, cycle_id: str, observation_prompt: str = None, action_response: dict = None):
-        """insert model chat note with optional observation and action"""
-        # Convert action_response dict to JSON string for JSONB column
-        action_json = json.dumps(action_response) if action_response else None
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "insert into model_chat (ts, content, cycle_id, observation_prompt, action_response) values ($1, $2, $3, $4, $5)",
-                ts, content, cycle_id, observation_prompt, action_json,
+        """buffer a model chat note with optional observation and action; written by the next flush()"""
+        self._chat_buffer.append((ts, content, cycle_id, observation_prompt, action_response or None))
+        await self._buffered()
+
+    async def _buffered(self):
+        """flush now if the buffers are full, otherwise make sure a delayed flush is pending"""
+        if len(self._equity_buffer) + len(self._chat_buffer) >= WRITE_BUFFER_MAX:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # the task inherited the caller's context; don't write on its (by then released) session connection
+        _session_conn.set(None)
+        await asyncio.sleep(WRITE_BUFFER_DELAY)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"buffered write flush failed: {e}")
+
+    async def flush(self):
+        """write buffered equity snapshots and chat rows (rows are re-queued if the write fails)"""
+        # under the lock, returning means every row buffered before the call is written
+        async with self._flush_lock:
+            equity, self._equity_buffer = self._equity_buffer, []
+            chats, self._chat_buffer = self._chat_buffer, []
+            try:
+                if equity:
+                    await self.insert_equity_snapshots_bulk(equity)
+                    equity = []
+                if chats:
+                    async with self._acquire() as conn:
+                        await conn.copy_records_to_table("model_chat", records=chats, columns=_CHAT_COLUMNS)
+            except Exception:
+                self._equity_buffer[:0] = equity
+                self._chat_buffer[:0] = chats
+                raise
+
+    async def get_metadata(self, key: str, conn: Optional[asyncpg.Connection] = None) -> Optional[any]:
+        """get metadata value (served from a short in-process cache; set_metadata invalidates it)"""
+        # callers get their own copy, so mutating a returned dict can't corrupt the cache
+        cached = self._metadata_cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return copy.deepcopy(cached[1])
+        async with self._acquire(conn) as conn:
+            row = await conn._stmts["get_metadata"].fetchrow(key)
+        value = row["value"] if row else None
+        self._metadata_cache[key] = (time.monotonic() + METADATA_CACHE_TTL, value)
+        return copy.deepcopy(value)
+
+    async def get_metadata_many(self, keys: List[str], conn: Optional[asyncpg.Connection] = None) -> Dict[str, any]:
+        """get several metadata values in one query (missing keys map to None); shares get_metadata's cache"""
+        now = time.monotonic()
+        values = {}
+        missing = []
+        for key in keys:
+            cached = self._metadata_cache.get(key)
+            if cached is not None and cached[0] > now:
+                values[key] = cached[1]
+            else:
+                missing.append(key)
+        if missing:
+            async with self._acquire(conn) as conn:
+                rows = await conn._stmts["get_metadata_many"].fetch(missing)
+            found = {r["key"]: r["value"] for r in rows}
+            expires = time.monotonic() + METADATA_CACHE_TTL
+            for key in missing:
+                values[key] = found.get(key)
+                self._metadata_cache[key] = (expires, values[key])
+        return copy.deepcopy(values)
+
+    async def set_metadata(self, key: str, value: any, conn: Optional[asyncpg.Connection] = None):
+        """set metadata value"""
+        async with self._acquire(conn) as conn:
+            await conn._stmts["set_metadata"].fetchval(
+                key, value,
             )
+        self._metadata_cache.pop(key, None)
 
-    async def get_metadata(self, key: str) -> Optional[any]:
-        """get metadata value"""
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow("select value from metadata where key = $1", key)
-            if row:
-                return json.loads(row["value"])
-            return None
-
-    async def set_metadata(self, key: str, value: any):
-        """set metadata value"""
-        async with self.pool.acquire() as conn:
-            await conn.execute(
+    async def set_metadata_many(self, items: Dict[str, any], conn: Optional[asyncpg.Connection] = None):
+        """set several metadata values in one pipelined batch"""
+        if not items:
+            return
+        async with self._acquire(conn) as conn:
+            await conn._stmts["set_metadata"].executemany(list(items.items()))
+        for key in items:
+            self._metadata_cache.pop(key, None)
+
+    async def get_trades(
+        self, limit: int = 100, before: Optional[datetime] = None, before_id: Optional[int] = None
+    ) -> List[asyncpg.Record]:
+        """
+        fetch recent trades as records (mapping access; call dict(r) if a real dict is needed).
+        to page further back, pass the last row's ts and id as `before` and `before_id`;
+        paging is on (ts, id) because several fills can share one ts.
+        """
+        if (before is None) != (before_id is None):
+            raise ValueError("before and before_id must be passed together")
+        async with self._acquire() as conn:
+            return await conn.fetch(
                 """
-                insert into metadata (key, value, updated_at)
-                values ($1, $2, now())
-                on conflict (key) do update set value = $2, updated_at = now()
+                select * from trades
+                where $2::timestamptz is null or (ts, id) < ($2, $3::bigint)
+                order by ts desc, id desc
+                limit $1
                 """,
-                key, json.dumps(value),
+                limit, before, before_id,
             )
 
-    async def get_trades(self, limit: int = 100) -> List[Dict]:
-        """fetch recent trades"""
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch(
-                "select * from trades order by ts desc limit $1", limit
+    @_ttl_cached(ANALYTICS_CACHE_TTL)
+    async def calculate_fees_paid(self, conn: Optional[asyncpg.Connection] = None) -> float:
+        """sum all fees paid (trigger-maintained total, falling back to a full sum)"""
+        async with self._acquire(conn) as conn:
+            total = await conn.fetchval(
+                "select (value #>> '{}')::float8 from metadata where key = 'trades_fee_total'"
             )
-            return [dict(r) for r in rows]
-
-    async def calculate_fees_paid(self) -> float:
-        """sum all fees paid"""
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow("select coalesce(sum(fee), 0) as total from trades")
-            return float(row["total"])
-
-    async def calculate_realized_pnl(self) -> float:
-        """calculate realized pnl from trades (simplified fifo)"""
-        # this is a simplified version; real impl would track fifo properly
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch("select symbol, side, qty, price from trades order by ts")
-            positions = {}
-            realized = 0.0
-            for r in rows:
-                symbol = r["symbol"]
-                if symbol not in positions:
-                    positions[symbol] = {"qty": 0.0, "cost": 0.0}
-                qty = float(r["qty"]) if r["side"] == "buy" else -float(r["qty"])
-                price = float(r["price"])
-                pos = positions[symbol]
-                if pos["qty"] * qty < 0:
-                    # closing trade
-                    close_qty = min(abs(qty), abs(pos["qty"]))
-                    avg_entry = pos["cost"] / pos["qty"] if pos["qty"] != 0 else 0
-                    realized += close_qty * (price - avg_entry) * (1 if pos["qty"] > 0 else -1)
-                    pos["qty"] += qty
-                    pos["cost"] += qty * price
-                else:
-                    # opening trade
-                    pos["qty"] += qty
-                    pos["cost"] += qty * price
-            return realized
-
-    async def get_completed_trades(self, limit: int = 100, version_id: int = None) -> List[Dict]:
+            if total is None:
+                total = await conn.fetchval("select coalesce(sum(fee), 0)::float8 from trades")
+            return total
+
+    @_ttl_cached(ANALYTICS_CACHE_TTL)
+    async def calculate_realized_pnl(self, conn: Optional[asyncpg.Connection] = None) -> float:
+        """calculate realized pnl (gross of fees) from trades via the completed_trades() replay"""
+        async with self._acquire(conn, analytics=True) as conn:
+            return await conn.fetchval("select coalesce(sum(gross_pnl), 0) from completed_trades()")
+
+    async def get_completed_trades(
+        self, limit: int = 100, version_id: int = None, conn: Optional[asyncpg.Connection] = None
+    ) -> List[asyncpg.Record]:
         """
         Calculate completed trades with full details.
-        Returns list of dicts with: symbol, direction, entry_time, exit_time,
+        Returns list of records with: symbol, direction, entry_time, exit_time,
         entry_price, exit_price, qty, entry_notional, exit_notional, holding_time_seconds, net_pnl
 
         Args:
             limit: Maximum number of trades to return
             version_id: Optional version ID to filter trades
+            conn: Optional connection to run on instead of acquiring one
         """
-        async with self.pool.acquire() as conn:
-            # Fetch recent trades with a limit to prevent memory issues
-            # We'll fetch more than the requested limit to ensure we can calculate completed positions
-            fetch_limit = max(limit * 10, 5000)
-            if version_id is not None:
-                rows = await conn.fetch(
-                    "select ts, symbol, side, qty, price, fee, entry_reason, exit_reason from trades where version_id = $1 order by ts desc limit $2",
-                    version_id, fetch_limit
-                )
-            else:
-                rows = await conn.fetch(
-                    "select ts, symbol, side, qty, price, fee, entry_reason, exit_reason from trades order by ts desc limit $1",
-                    fetch_limit
-                )
-            # Reverse to process chronologically
-            rows = list(reversed(rows))
-
-            positions = {}  # symbol -> {qty, cost, entry_time, entry_trades, fees, entry_reason}
-            completed = []
-
-            for r in rows:
-                symbol = r["symbol"]
-                side = r["side"]
-                qty = float(r["qty"])
-                price = float(r["price"])
-                fee = float(r["fee"])
-                ts = r["ts"]
-                entry_reason = r.get("entry_reason")
-                exit_reason = r.get("exit_reason")
-
-                if symbol not in positions:
-                    positions[symbol] = {
-                        "qty": 0.0,
-                        "cost": 0.0,
-                        "entry_time": None,
-                        "entry_trades": [],
-                        "fees": 0.0,
-                        "entry_reason": None
-                    }
-
-                pos = positions[symbol]
-                signed_qty = qty if side == "buy" else -qty
-
-                if pos["qty"] == 0:
-                    # Opening new position
-                    pos["qty"] = signed_qty
-                    pos["cost"] = signed_qty * price
-                    pos["entry_time"] = ts
-                    pos["entry_trades"] = [(price, abs(signed_qty), fee)]
-                    pos["fees"] = fee
-                    pos["entry_reason"] = entry_reason  # Store entry reason
-
-                elif pos["qty"] * signed_qty > 0:
-                    # Adding to position
-                    pos["qty"] += signed_qty
-                    pos["cost"] += signed_qty * price
-                    pos["entry_trades"].append((price, abs(signed_qty), fee))
-                    pos["fees"] += fee
-                    # Keep the first entry reason if not set
-                    if not pos["entry_reason"] and entry_reason:
-                        pos["entry_reason"] = entry_reason
-
-                else:
-                    # Closing or reversing position
-                    close_qty = min(abs(signed_qty), abs(pos["qty"]))
-                    direction = "long" if pos["qty"] > 0 else "short"
-
-                    # Calculate average entry price
-                    avg_entry = pos["cost"] / pos["qty"] if pos["qty"] != 0 else 0
-
-                    # Calculate P&L for closed portion
-                    if pos["qty"] > 0:
-                        gross_pnl = close_qty * (price - avg_entry)
-                    else:
-                        gross_pnl = close_qty * (avg_entry - price)
-
-                    # Pro-rate fees based on close quantity
-                    close_ratio = close_qty / abs(pos["qty"])
-                    allocated_fees = pos["fees"] * close_ratio + fee * (close_qty / abs(signed_qty))
-                    net_pnl = gross_pnl - allocated_fees
-
-                    # Calculate holding time
-                    holding_time_seconds = (ts - pos["entry_time"]).total_seconds() if pos["entry_time"] else 0
-
-                    # Calculate notionals
-                    entry_notional = close_qty * abs(avg_entry)
-                    exit_notional = close_qty * price
-
-                    # Record completed trade
-                    completed.append({
-                        "symbol": symbol,
-                        "direction": direction,
-                        "entry_time": pos["entry_time"],
-                        "exit_time": ts,
-                        "entry_price": abs(avg_entry),
-                        "exit_price": price,
-                        "qty": close_qty,
-                        "entry_notional": entry_notional,
-                        "exit_notional": exit_notional,
-                        "holding_time_seconds": holding_time_seconds,
-                        "net_pnl": net_pnl,
-                        "entry_reason": pos["entry_reason"],
-                        "exit_reason": exit_reason
-                    })
-
-                    # Update position
-                    pos["qty"] += signed_qty
-                    if abs(pos["qty"]) < 1e-6:
-                        # Position fully closed
-                        pos["qty"] = 0.0
-                        pos["cost"] = 0.0
-                        pos["entry_time"] = None
-                        pos["entry_trades"] = []
-                        pos["fees"] = 0.0
-                    else:
-                        # Reduce cost proportionally or handle reversal
-                        if pos["qty"] * signed_qty > 0:
-                            # Reversal - new position in opposite direction
-                            remaining_qty = abs(pos["qty"])
-                            pos["cost"] = pos["qty"] * price
-                            pos["entry_time"] = ts
-                            pos["entry_trades"] = [(price, remaining_qty, fee * (remaining_qty / abs(signed_qty)))]
-                            pos["fees"] = fee * (remaining_qty / abs(signed_qty))
-                        else:
-                            # Partial close
-                            pos["cost"] *= (1 - close_ratio)
-                            pos["fees"] *= (1 - close_ratio)
-
-            # Return most recent completed trades first
-            return list(reversed(completed))[-limit:]
+        async with self._acquire(conn, analytics=True) as conn:
+            # FIFO replay runs server-side in completed_trades() (see migrations)
+            return await conn.fetch(
+                """
+                select symbol, direction, entry_time, exit_time, entry_price, exit_price, qty,
+                       entry_notional, exit_notional, holding_time_seconds, net_pnl,
+                       entry_reason, exit_reason
+                from completed_trades($1::bigint)
+                order by exit_time desc, trade_id desc
+                limit $2
+                """,
+                version_id, limit,
+            )
 
     async def update_market_prices(self, prices: Dict[str, float]):
         """Update market prices for all symbols"""
-        async with self.pool.acquire() as conn:
-            for symbol, price in prices.items():
-                await conn.execute(
-                    """
-                    insert into market_prices (symbol, price, updated_at)
-                    values ($1, $2, now())
-                    on conflict (symbol) do update set price = $2, updated_at = now()
-                    """,
-                    symbol, price,
-                )
+        # only write symbols whose price moved since the last successful write
+        changed = {s: p for s, p in prices.items() if self._last_prices.get(s) != p}
+        if not changed:
+            return
+        symbols, symbol_prices = zip(*changed.items())
+        async with self._acquire() as conn:
+            # one multi-row upsert: a single statement and round trip for all symbols
+            await conn.execute(
+                """
+                insert into market_prices (symbol, price, updated_at)
+                select symbol, price, now() from unnest($1::text[], $2::float8[]) as u(symbol, price)
+                on conflict (symbol) do update set price = excluded.price, updated_at = now()
+                where market_prices.price is distinct from excluded.price
+                """,
+                list(symbols), list(symbol_prices),
+            )
+        self._last_prices.update(changed)
 
-    async def calculate_performance_metrics(self, version_id: int = None) -> Dict:
+    @_ttl_cached(ANALYTICS_CACHE_TTL)
+    async def calculate_performance_metrics(self, version_id: int = None, conn: Optional[asyncpg.Connection] = None) -> Dict:
         """
         Calculate comprehensive performance metrics from completed trades.
 
         Args:
             version_id: Optional version ID to filter trades
+            conn: Optional connection to run on instead of acquiring one
 
         Returns dict with:
         - win_rate: % of profitable trades
@@ -358,9 +503,26 @@ class Database:
         - avg_hold_time_minutes: average holding time across all trades
         - total_volume: total traded volume
         """
-        completed = await self.get_completed_trades(limit=10000, version_id=version_id)  # Get all trades
+        async with self._acquire(conn, analytics=True) as conn:
+            row = await conn.fetchrow(
+                """
+                select
+                  count(*) as total_trades,
+                  count(*) filter (where net_pnl > 0) as num_wins,
+                  count(*) filter (where net_pnl < 0) as num_losses,
+                  coalesce(avg(net_pnl) filter (where net_pnl > 0), 0) as avg_win,
+                  coalesce(avg(net_pnl) filter (where net_pnl < 0), 0) as avg_loss,
+                  coalesce(max(net_pnl) filter (where net_pnl > 0), 0) as largest_win,
+                  coalesce(min(net_pnl) filter (where net_pnl < 0), 0) as largest_loss,
+                  coalesce(avg(holding_time_seconds), 0) / 60.0 as avg_hold_time_minutes,
+                  coalesce(sum(entry_notional), 0) as total_volume
+                from completed_trades($1::bigint)
+                """,
+                version_id
+            )
 
-        if not completed:
+        total_trades = row["total_trades"]
+        if not total_trades:
             return {
                 "win_rate": 0.0,
                 "total_trades": 0,
@@ -375,26 +537,22 @@ class Database:
                 "total_volume": 0.0,
             }
 
-        winning_trades = [t for t in completed if t["net_pnl"] > 0]
-        losing_trades = [t for t in completed if t["net_pnl"] < 0]
-
-        total_trades = len(completed)
-        num_wins = len(winning_trades)
-        num_losses = len(losing_trades)
+        num_wins = row["num_wins"]
+        num_losses = row["num_losses"]
 
         win_rate = (num_wins / total_trades * 100) if total_trades > 0 else 0.0
 
-        avg_win = sum(t["net_pnl"] for t in winning_trades) / num_wins if num_wins > 0 else 0.0
-        avg_loss = sum(t["net_pnl"] for t in losing_trades) / num_losses if num_losses > 0 else 0.0
+        avg_win = row["avg_win"]
+        avg_loss = row["avg_loss"]
 
         profit_factor = abs(avg_win / avg_loss) if avg_loss != 0 else 0.0
 
-        largest_win = max((t["net_pnl"] for t in winning_trades), default=0.0)
-        largest_loss = min((t["net_pnl"] for t in losing_trades), default=0.0)
+        largest_win = row["largest_win"]
+        largest_loss = row["largest_loss"]
 
-        avg_hold_time_minutes = sum(t["holding_time_seconds"] for t in completed) / len(completed) / 60.0
+        avg_hold_time_minutes = row["avg_hold_time_minutes"]
 
-        total_volume = sum(t["entry_notional"] for t in completed)
+        total_volume = row["total_volume"]
 
         return {
             "win_rate": round(win_rate, 2),
@@ -410,12 +568,16 @@ class Database:
             "total_volume": round(total_volume, 2),
         }
 
-    async def calculate_per_symbol_performance(self, version_id: int = None) -> Dict[str, Dict]:
+    @_ttl_cached(ANALYTICS_CACHE_TTL)
+    async def calculate_per_symbol_performance(
+        self, version_id: int = None, conn: Optional[asyncpg.Connection] = None
+    ) -> Dict[str, Dict]:
         """
         Calculate performance metrics broken down by symbol.
 
         Args:
             version_id: Optional version ID to filter trades
+            conn: Optional connection to run on instead of acquiring one
 
         Returns dict of symbol -> performance metrics:
         - total_pnl: Total P&L for this symbol
@@ -425,150 +587,135 @@ class Database:
         - largest_win: Biggest winning trade
         - largest_loss: Biggest losing trade
         """
-        completed = await self.get_completed_trades(limit=10000, version_id=version_id)
-
-        if not completed:
-            return {}
-
-        # Group trades by symbol
-        symbol_trades = {}
-        for trade in completed:
-            symbol = trade["symbol"]
-            if symbol not in symbol_trades:
-                symbol_trades[symbol] = []
-            symbol_trades[symbol].append(trade)
+        async with self._acquire(conn, analytics=True) as conn:
+            # symbols ordered by their most recent exit, as before
+            rows = await conn.fetch(
+                """
+                select
+                  symbol,
+                  sum(net_pnl) as total_pnl,
+                  count(*) as total_trades,
+                  count(*) filter (where net_pnl > 0) as num_wins,
+                  coalesce(max(net_pnl) filter (where net_pnl > 0), 0) as largest_win,
+                  coalesce(min(net_pnl) filter (where net_pnl < 0), 0) as largest_loss
+                from completed_trades($1::bigint)
+                group by symbol
+                order by max(exit_time) desc
+                """,
+                version_id
+            )
 
-        # Calculate metrics per symbol
         per_symbol_stats = {}
-        for symbol, trades in symbol_trades.items():
-            winning_trades = [t for t in trades if t["net_pnl"] > 0]
-            losing_trades = [t for t in trades if t["net_pnl"] < 0]
-
-            total_trades = len(trades)
-            num_wins = len(winning_trades)
-            total_pnl = sum(t["net_pnl"] for t in trades)
-            win_rate = (num_wins / total_trades * 100) if total_trades > 0 else 0.0
+        for r in rows:
+            total_trades = r["total_trades"]
+            total_pnl = r["total_pnl"]
+            win_rate = (r["num_wins"] / total_trades * 100) if total_trades > 0 else 0.0
             avg_pnl = total_pnl / total_trades if total_trades > 0 else 0.0
-            largest_win = max((t["net_pnl"] for t in winning_trades), default=0.0)
-            largest_loss = min((t["net_pnl"] for t in losing_trades), default=0.0)
 
-            per_symbol_stats[symbol] = {
+            per_symbol_stats[r["symbol"]] = {
                 "total_pnl": round(total_pnl, 2),
                 "total_trades": total_trades,
                 "win_rate": round(win_rate, 1),
                 "avg_pnl": round(avg_pnl, 2),
-                "largest_win": round(largest_win, 2),
-                "largest_loss": round(largest_loss, 2),
+                "largest_win": round(r["largest_win"], 2),
+                "largest_loss": round(r["largest_loss"], 2),
             }
 
         return per_symbol_stats
 
-    async def calculate_sharpe_ratio(self, days: int = 30, version_id: int = None) -> float:
+    @_flushes_first
+    @_ttl_cached(ANALYTICS_CACHE_TTL)
+    async def calculate_sharpe_ratio(
+        self, days: int = 30, version_id: int = None, conn: Optional[asyncpg.Connection] = None
+    ) -> float:
         """
         Calculate Sharpe ratio from equity snapshots.
 
         Args:
             days: Number of days to look back
             version_id: Optional version ID to filter equity snapshots
+            conn: Optional connection to run on instead of acquiring one
 
         Returns:
             Annualized Sharpe ratio
         """
-        async with self.pool.acquire() as conn:
-            # Get equity snapshots for the last N days
-            if version_id is not None:
-                rows = await conn.fetch(
-                    f"""
-                    select ts, equity
-                    from equity_snapshots
-                    where ts >= now() - interval '{days} days'
-                    and version_id = $1
-                    order by ts
-                    """,
-                    version_id
-                )
-            else:
-                rows = await conn.fetch(
-                    f"""
-                    select ts, equity
-                    from equity_snapshots
-                    where ts >= now() - interval '{days} days'
-                    order by ts
-                    """
+        async with self._acquire(conn, analytics=True) as conn:
+            # Per-snapshot returns over the last N days, reduced in the database
+            row = await conn.fetchrow(
+                """
+                with r as (
+                  select (equity - lag(equity) over (order by ts))
+                         / nullif(lag(equity) over (order by ts), 0) as ret
+                  from equity_snapshots
+                  where ts >= now() - make_interval(days => $2::int)
+                  and ($1::bigint is null or version_id = $1)
                 )
+                select avg(ret)::float8 as mean_return, stddev_pop(ret)::float8 as std_return
+                from r
+                where ret is not null
+                """,
+                version_id, days
+            )
 
-            if len(rows) < 2:
-                return 0.0
-
-            # Calculate returns
-            equities = [float(r["equity"]) for r in rows]
-            returns = []
-            for i in range(1, len(equities)):
-                if equities[i-1] != 0:
-                    ret = (equities[i] - equities[i-1]) / equities[i-1]
-                    returns.append(ret)
-
-            if not returns:
-                return 0.0
-
-            # Calculate Sharpe
-            import numpy as np
-            mean_return = np.mean(returns)
-            std_return = np.std(returns)
-
-            if std_return == 0:
+            mean_return = row["mean_return"]
+            std_return = row["std_return"]
+            if mean_return is None or not std_return:
                 return 0.0
 
             # Annualize (assuming 1 snapshot per minute, 1440 per day)
-            sharpe = (mean_return / std_return) * np.sqrt(1440 * 365)
+            sharpe = (mean_return / std_return) * math.sqrt(1440 * 365)
 
             return round(sharpe, 3)
 
-    async def calculate_max_drawdown(self, version_id: int = None) -> float:
+    @_flushes_first
+    @_ttl_cached(ANALYTICS_CACHE_TTL)
+    async def calculate_max_drawdown(self, version_id: int = None, conn: Optional[asyncpg.Connection] = None) -> float:
         """
         Calculate maximum drawdown from equity curve.
 
         Args:
             version_id: Optional version ID to filter equity snapshots
+            conn: Optional connection to run on instead of acquiring one
 
         Returns:
             Maximum drawdown as a percentage
         """
-        async with self.pool.acquire() as conn:
-            if version_id is not None:
-                rows = await conn.fetch(
+        import numpy as np
+
+        async with self._acquire(conn, analytics=True) as conn:
+            # stream the curve through a server-side cursor in chunks, carrying the
+            # running peak across chunk boundaries
+            peak = None
+            max_dd = 0.0
+            count = 0
+            async with conn.transaction():
+                cursor = await conn.cursor(
                     """
-                    select equity
+                    select equity::float8
                     from equity_snapshots
-                    where version_id = $1
+                    where $1::bigint is null or version_id = $1
                     order by ts
                     """,
                     version_id
                 )
-            else:
-                rows = await conn.fetch(
-                    """
-                    select equity
-                    from equity_snapshots
-                    order by ts
-                    """
-                )
-
-            if len(rows) < 2:
+                while True:
+                    rows = await cursor.fetch(5000)
+                    if not rows:
+                        break
+                    count += len(rows)
+                    equities = np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows))
+                    if peak is None:
+                        peak = equities[0]
+
+                    # running peak, then drawdown from it (0 where the peak isn't positive)
+                    peaks = np.maximum.accumulate(np.maximum(equities, peak))
+                    drawdowns = np.where(peaks > 0, (peaks - equities) / np.where(peaks > 0, peaks, 1.0) * 100, 0.0)
+                    max_dd = max(max_dd, float(drawdowns.max()))
+                    peak = peaks[-1]
+
+            if count < 2:
                 return 0.0
 
-            equities = [float(r["equity"]) for r in rows]
-
-            peak = equities[0]
-            max_dd = 0.0
-
-            for equity in equities:
-                if equity > peak:
-                    peak = equity
-
-                drawdown = (peak - equity) / peak * 100 if peak > 0 else 0.0
-                max_dd = max(max_dd, drawdown)
-
             return round(max_dd, 2)
 
     # ========== Version Management ==========
@@ -580,29 +727,24 @@ class Database:
         Returns:
             version_id (int): The ID of the version
         """
-        async with self.pool.acquire() as conn:
-            # Check if version already exists
-            row = await conn.fetchrow(
-                "select id from agent_versions where version_tag = $1",
-                version_tag
-            )
-
-            if row:
-                logger.info(f"Version {version_tag} already exists with id={row['id']}")
-                return row['id']
-
-            # Create new version
+        async with self._acquire() as conn:
+            # one atomic round trip; the no-op update makes returning see an existing row.
+            # xmax is 0 only on a freshly inserted tuple
             row = await conn.fetchrow(
                 """
                 insert into agent_versions (version_tag, description, config, deployed_at)
                 values ($1, $2, $3, now())
-                returning id
+                on conflict (version_tag) do update set version_tag = excluded.version_tag
+                returning id, (xmax = 0) as inserted
                 """,
-                version_tag, description, json.dumps(config)
+                version_tag, description, config
             )
 
             version_id = row['id']
-            logger.info(f"Registered new version {version_tag} with id={version_id}")
+            if row['inserted']:
+                logger.info(f"Registered new version {version_tag} with id={version_id}")
+            else:
+                logger.info(f"Version {version_tag} already exists with id={version_id}")
             return version_id
 
     async def start_version_activity(self, version_id: int) -> int:
@@ -613,25 +755,26 @@ class Database:
         Returns:
             activity_id (int): The ID of the activity record
         """
-        async with self.pool.acquire() as conn:
-            # End any currently active version
-            await conn.execute(
-                """
-                update version_activity
-                set ended_at = now()
-                where ended_at is null
-                """
-            )
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                # End any currently active version
+                await conn.execute(
+                    """
+                    update version_activity
+                    set ended_at = now()
+                    where ended_at is null
+                    """
+                )
 
-            # Start new activity
-            row = await conn.fetchrow(
-                """
-                insert into version_activity (version_id, started_at)
-                values ($1, now())
-                returning id
-                """,
-                version_id
-            )
+                # Start new activity
+                row = await conn.fetchrow(
+                    """
+                    insert into version_activity (version_id, started_at)
+                    values ($1, now())
+                    returning id
+                    """,
+                    version_id
+                )
 
             activity_id = row['id']
             logger.info(f"Started activity for version_id={version_id}, activity_id={activity_id}")
@@ -639,7 +782,7 @@ class Database:
 
     async def get_current_version_id(self) -> Optional[int]:
         """Get the currently active version ID"""
-        async with self.pool.acquire() as conn:
+        async with self._acquire() as conn:
             row = await conn.fetchrow(
                 """
                 select version_id
@@ -658,98 +801,105 @@ class Database:
             logger.warning("No active version to end")
             return
 
-        async with self.pool.acquire() as conn:
-            # End the activity
-            await conn.execute(
-                """
-                update version_activity
-                set ended_at = now()
-                where version_id = $1 and ended_at is null
-                """,
-                version_id
-            )
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                # End the activity
+                await conn.execute(
+                    """
+                    update version_activity
+                    set ended_at = now()
+                    where version_id = $1 and ended_at is null
+                    """,
+                    version_id
+                )
 
-            # Mark version as retired
-            await conn.execute(
-                """
-                update agent_versions
-                set retired_at = now()
-                where id = $1
-                """,
-                version_id
-            )
+                # Mark version as retired
+                await conn.execute(
+                    """
+                    update agent_versions
+                    set retired_at = now()
+                    where id = $1
+                    """,
+                    version_id
+                )
 
         # Calculate final performance
         await self.calculate_version_performance(version_id)
         logger.info(f"Ended version_id={version_id} and calculated final performance")
 
+    @_flushes_first
     async def calculate_version_performance(self, version_id: int):
         """
         Calculate comprehensive performance metrics for a version.
         """
-        async with self.pool.acquire() as conn:
-            # Get activity period
-            activity = await conn.fetchrow(
+        # whole rollup on one connection, inside one transaction
+        async with self._acquire() as conn, conn.transaction():
+            # activity period, equity endpoints, drawdown, fees and cycle count in one round trip
+            summary = await conn.fetchrow(
                 """
-                select min(started_at) as period_start, max(coalesce(ended_at, now())) as period_end
-                from version_activity
-                where version_id = $1
+                with activity as (
+                    select min(started_at) as period_start, max(coalesce(ended_at, now())) as period_end
+                    from version_activity
+                    where version_id = $1
+                ),
+                curve as (
+                    select equity::float8 as equity, max(equity::float8) over (order by ts) as peak
+                    from equity_snapshots
+                    where version_id = $1
+                ),
+                drawdown as (
+                    select
+                        count(*) as points,
+                        coalesce(max(case when peak > 0 then (peak - equity) / peak * 100 else 0 end), 0) as max_dd
+                    from curve
+                )
+                select
+                    a.period_start,
+                    a.period_end,
+                    d.points,
+                    d.max_dd,
+                    (select equity::float8 from equity_snapshots where version_id = $1 order by ts limit 1) as starting_equity,
+                    (select equity::float8 from equity_snapshots where version_id = $1 order by ts desc limit 1) as ending_equity,
+                    (select coalesce(sum(fee), 0)::float8 from trades where version_id = $1) as fees,
+                    (select count(*) from model_chat where version_id = $1) as total_cycles
+                from activity a, drawdown d
                 """,
                 version_id
             )
 
-            if not activity:
+            if summary['period_start'] is None:
                 logger.warning(f"No activity found for version_id={version_id}")
                 return
 
-            period_start = activity['period_start']
-            period_end = activity['period_end']
+            period_start = summary['period_start']
+            period_end = summary['period_end']
             duration_seconds = (period_end - period_start).total_seconds()
             duration_days = duration_seconds / 86400.0
 
-            # Get equity snapshots for this version
-            equity_rows = await conn.fetch(
-                """
-                select equity, ts
-                from equity_snapshots
-                where version_id = $1
-                order by ts
-                """,
-                version_id
-            )
-
-            if len(equity_rows) < 2:
+            if summary['points'] < 2:
                 logger.warning(f"Not enough equity data for version_id={version_id}")
                 return
 
-            starting_equity = float(equity_rows[0]['equity'])
-            ending_equity = float(equity_rows[-1]['equity'])
+            starting_equity = summary['starting_equity']
+            ending_equity = summary['ending_equity']
             total_return_pct = ((ending_equity - starting_equity) / starting_equity * 100) if starting_equity > 0 else 0.0
             daily_return_pct = (total_return_pct / duration_days) if duration_days > 0 else 0.0
 
             # Calculate performance metrics for this version (uses completed round-trip trades)
-            perf_metrics = await self.calculate_performance_metrics(version_id=version_id)
-            sharpe_30d = await self.calculate_sharpe_ratio(days=30, version_id=version_id)
-            max_dd = await self.calculate_max_drawdown(version_id=version_id)
+            perf_metrics = await self.calculate_performance_metrics(version_id=version_id, conn=conn)
+            sharpe_30d = await self.calculate_sharpe_ratio(days=30, version_id=version_id, conn=conn)
+            max_dd = round(summary['max_dd'], 2)
 
             # Get completed trade count (round-trip positions, not individual fills)
             total_trades = perf_metrics['total_trades']
             trades_per_day = (total_trades / duration_days) if duration_days > 0 else 0.0
 
-            # Get fees and PnL
-            fees = await conn.fetchval(
-                "select coalesce(sum(fee), 0) from trades where version_id = $1",
-                version_id
-            )
-
+            fees = summary['fees']
             realized_pnl = ending_equity - starting_equity
             pnl_per_day = (realized_pnl / duration_days) if duration_days > 0 else 0.0
 
-            # Count decision cycles (chat messages)
-            total_cycles = await conn.fetchval(
-                "select count(*) from model_chat where version_id = $1",
-                version_id
-            )
+            # decision cycles (chat messages)
+            total_cycles = summary['total_cycles']
 
             # Upsert performance record
             await conn.execute(
@@ -796,10 +946,12 @@ class Database:
                 round(starting_equity, 2), round(ending_equity, 2)
             )
 
+            self._invalidate()
             logger.info(f"Calculated performance for version_id={version_id}: "
                        f"return={total_return_pct:.2f}%, sharpe={sharpe_30d:.2f}, "
                        f"trades={total_trades}, duration={duration_days:.1f}d")
 
+    @_ttl_cached(ANALYTICS_CACHE_TTL)
     async def get_version_leaderboard(self, min_duration_hours: float = 0) -> List[Dict]:
         """
         Get leaderboard of all versions sorted by performance.
@@ -810,7 +962,7 @@ class Database:
         Returns:
             List of version performance records
         """
-        async with self.pool.acquire() as conn:
+        async with self._acquire() as conn:
             rows = await conn.fetch(
                 """
                 select
@@ -818,7 +970,7 @@ class Database:
                     v.description,
                     v.deployed_at,
                     v.retired_at,
-                    case when v.retired_at is null then true else false end as is_active,
+                    v.retired_at is null as is_active,
                     p.duration_days,
                     p.total_cycles,
                     p.total_return_pct,
@@ -836,8 +988,8 @@ class Database:
                     p.starting_equity,
                     p.ending_equity
                 from agent_versions v
-                left join version_performance p on v.id = p.version_id
-                where p.duration_days >= $1 / 24.0
+                join version_performance p on v.id = p.version_id
+                where p.duration_days * 24 >= $1
                 order by p.sharpe_ratio desc nulls last, p.total_return_pct desc nulls last
                 """,
                 min_duration_hours
@@ -845,6 +997,7 @@ class Database:
 
             return [dict(r) for r in rows]
 
+    @_flushes_first
     async def update_current_version_tags(self):
         """
         Tag all recent untagged records (trades, equity, chat) with current version_id.
@@ -854,24 +1007,19 @@ class Database:
         if not version_id:
             return
 
-        async with self.pool.acquire() as conn:
-            # Tag trades
-            await conn.execute(
-                "update trades set version_id = $1 where version_id is null",
-                version_id
-            )
-
-            # Tag equity snapshots
-            await conn.execute(
-                "update equity_snapshots set version_id = $1 where version_id is null",
-                version_id
-            )
+        async def tag(table: str) -> int:
+            async with self._acquire() as conn:
+                status = await conn.execute(
+                    f"update {table} set version_id = $1 where version_id is null",
+                    version_id
+                )
+            return int(status.split()[-1])
 
-            # Tag chat messages
-            await conn.execute(
-                "update model_chat set version_id = $1 where version_id is null",
-                version_id
-            )
+        # the three tables are independent, so each update gets its own connection;
+        # the partial untagged indexes keep these cheap when nothing is new
+        tagged = await self.fan_out(tag(t) for t in ("trades", "equity_snapshots", "model_chat"))
+        if any(tagged):
+            self._invalidate()
 
     async def prepare_for_new_version(self):
         """
@@ -888,30 +1036,34 @@ class Database:
         # End current version
         await self.end_current_version()
 
-        async with self.pool.acquire() as conn:
-            # Clear current positions (new version starts fresh)
-            await conn.execute("DELETE FROM positions")
-            logger.info("Cleared current positions")
-
-            # Clear account state metadata (but preserve version performance data)
-            await conn.execute("""
-                DELETE FROM metadata WHERE key IN (
-                    'pnl_all_time',
-                    'fees_paid_total',
-                    'max_dd',
-                    'sim_fees',
-                    'sim_funding',
-                    'sim_realized',
-                    'last_error'
-                )
-            """)
-            logger.info("Cleared account state metadata")
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                # Clear current positions (new version starts fresh)
+                await conn.execute("DELETE FROM positions")
+                logger.info("Cleared current positions")
+
+                # Clear account state metadata (but preserve version performance data)
+                await conn.execute("""
+                    DELETE FROM metadata WHERE key IN (
+                        'pnl_all_time',
+                        'fees_paid_total',
+                        'max_dd',
+                        'sim_fees',
+                        'sim_funding',
+                        'sim_realized',
+                        'last_error'
+                    )
+                """)
+                logger.info("Cleared account state metadata")
+
+                # Clear exit plans (new version will create fresh ones)
+                await conn.execute("DELETE FROM metadata WHERE key LIKE 'exit_plan_%'")
+                logger.info("Cleared exit plans")
 
-            # Clear exit plans (new version will create fresh ones)
-            await conn.execute("DELETE FROM metadata WHERE key LIKE 'exit_plan_%'")
-            logger.info("Cleared exit plans")
+                # Note: We keep trades, equity_snapshots, and model_chat with their version_id
+                # This preserves historical data for the leaderboard
 
-            # Note: We keep trades, equity_snapshots, and model_chat with their version_id
-            # This preserves historical data for the leaderboard
+        self._metadata_cache.clear()
+        self._invalidate()
 
         logger.info("Database prepared for new version. Deploy new version now.")
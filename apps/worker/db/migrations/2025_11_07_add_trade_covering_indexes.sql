@@ -0,0 +1,13 @@
+-- Migration: Covering index for recent-trade scans
+-- Date: 2025-11-07
+-- Description: Let get_trades / get_completed_trades read ts-ordered trades
+-- without heap lookups. client_id (unique) and positions.symbol (primary key)
+-- are already indexed.
+
+create index if not exists idx_trades_ts_covering
+  on trades (ts desc) include (id, symbol, side, qty, price, fee, version_id);
+
+-- superseded by the covering index above
+drop index if exists idx_trades_ts;
+
+analyze trades;
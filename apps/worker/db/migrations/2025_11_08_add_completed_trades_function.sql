@@ -0,0 +1,129 @@
+-- Migration: Server-side completed-trades replay
+-- Date: 2025-11-08
+-- Description: Average-cost replay of fills into closed round trips, so the
+-- worker no longer streams the whole trades table into Python. Mirrors the
+-- former Database.get_completed_trades loop: fees are pro-rated by close
+-- quantity and a reversing fill closes the old side and opens the new one.
+
+create or replace function completed_trades(p_version_id bigint default null)
+returns table (
+  trade_id bigint,            -- id of the closing fill
+  symbol text,
+  direction text,
+  entry_time timestamptz,
+  exit_time timestamptz,
+  entry_price float8,
+  exit_price float8,
+  qty float8,
+  entry_notional float8,
+  exit_notional float8,
+  holding_time_seconds float8,
+  gross_pnl float8,
+  fees float8,
+  net_pnl float8,
+  entry_reason text,
+  exit_reason text
+)
+language plpgsql stable
+as $$
+#variable_conflict use_column
+declare
+  r record;
+  cur_symbol text := null;
+  pos_qty float8 := 0;
+  pos_cost float8 := 0;
+  pos_fees float8 := 0;
+  pos_entry_time timestamptz := null;
+  pos_entry_reason text := null;
+  abs_qty float8;
+  close_qty float8;
+  close_ratio float8;
+  avg_entry float8;
+begin
+  for r in
+    select t.id, t.ts, t.symbol, t.entry_reason, t.exit_reason,
+           (case when t.side = 'buy' then t.qty else -t.qty end)::float8 as signed_qty,
+           t.price::float8 as price,
+           t.fee::float8 as fee
+    from trades t
+    where p_version_id is null or t.version_id = p_version_id
+    order by t.symbol, t.ts, t.id
+  loop
+    if cur_symbol is distinct from r.symbol then
+      cur_symbol := r.symbol;
+      pos_qty := 0;
+      pos_cost := 0;
+      pos_fees := 0;
+      pos_entry_time := null;
+      pos_entry_reason := null;
+    end if;
+
+    abs_qty := abs(r.signed_qty);
+
+    if pos_qty = 0 then
+      -- opening new position
+      pos_qty := r.signed_qty;
+      pos_cost := r.signed_qty * r.price;
+      pos_entry_time := r.ts;
+      pos_fees := r.fee;
+      pos_entry_reason := r.entry_reason;
+
+    elsif pos_qty * r.signed_qty > 0 then
+      -- adding to position; keep the first entry reason
+      pos_qty := pos_qty + r.signed_qty;
+      pos_cost := pos_cost + r.signed_qty * r.price;
+      pos_fees := pos_fees + r.fee;
+      if coalesce(pos_entry_reason, '') = '' and coalesce(r.entry_reason, '') <> '' then
+        pos_entry_reason := r.entry_reason;
+      end if;
+
+    else
+      -- closing or reversing position
+      close_qty := least(abs_qty, abs(pos_qty));
+      avg_entry := pos_cost / pos_qty;
+      close_ratio := close_qty / abs(pos_qty);
+
+      trade_id := r.id;
+      symbol := r.symbol;
+      direction := case when pos_qty > 0 then 'long' else 'short' end;
+      entry_time := pos_entry_time;
+      exit_time := r.ts;
+      entry_price := abs(avg_entry);
+      exit_price := r.price;
+      qty := close_qty;
+      entry_notional := close_qty * abs(avg_entry);
+      exit_notional := close_qty * r.price;
+      holding_time_seconds := coalesce(extract(epoch from (r.ts - pos_entry_time))::float8, 0);
+      gross_pnl := case when pos_qty > 0
+                        then close_qty * (r.price - avg_entry)
+                        else close_qty * (avg_entry - r.price) end;
+      fees := pos_fees * close_ratio + r.fee * (close_qty / abs_qty);
+      net_pnl := gross_pnl - fees;
+      entry_reason := pos_entry_reason;
+      exit_reason := r.exit_reason;
+      return next;
+
+      pos_qty := pos_qty + r.signed_qty;
+      if abs(pos_qty) < 1e-6 then
+        -- fully closed
+        pos_qty := 0;
+        pos_cost := 0;
+        pos_entry_time := null;
+        pos_fees := 0;
+      elsif pos_qty * r.signed_qty > 0 then
+        -- reversal: remainder opens the opposite side at this fill
+        pos_cost := pos_qty * r.price;
+        pos_entry_time := r.ts;
+        pos_fees := r.fee * (abs(pos_qty) / abs_qty);
+      else
+        -- partial close
+        pos_cost := pos_cost * (1 - close_ratio);
+        pos_fees := pos_fees * (1 - close_ratio);
+      end if;
+    end if;
+  end loop;
+end;
+$$;
+
+create or replace view completed_trades_v as
+  select * from completed_trades();
@@ -0,0 +1,48 @@
+-- Migration: Running fee total for trades
+-- Date: 2025-11-10
+-- Description: Keep sum(trades.fee) in metadata['trades_fee_total'] so
+-- calculate_fees_paid is a keyed lookup instead of a full-table aggregate.
+
+insert into metadata (key, value, updated_at)
+select 'trades_fee_total', to_jsonb(coalesce(sum(fee), 0)), now() from trades
+on conflict (key) do update set value = excluded.value, updated_at = now();
+
+create or replace function trades_fee_total_apply() returns trigger
+language plpgsql
+as $$
+declare
+  delta numeric := 0;
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    delta := delta + new.fee;
+  end if;
+  if tg_op in ('DELETE', 'UPDATE') then
+    delta := delta - old.fee;
+  end if;
+  if delta <> 0 then
+    update metadata
+    set value = to_jsonb((value #>> '{}')::numeric + delta), updated_at = now()
+    where key = 'trades_fee_total';
+  end if;
+  return null;
+end;
+$$;
+
+create or replace function trades_fee_total_reset() returns trigger
+language plpgsql
+as $$
+begin
+  update metadata set value = '0'::jsonb, updated_at = now() where key = 'trades_fee_total';
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_trades_fee_total on trades;
+create trigger trg_trades_fee_total
+  after insert or delete or update of fee on trades
+  for each row execute function trades_fee_total_apply();
+
+drop trigger if exists trg_trades_fee_total_truncate on trades;
+create trigger trg_trades_fee_total_truncate
+  after truncate on trades
+  for each statement execute function trades_fee_total_reset();
@@ -0,0 +1,13 @@
+-- Migration: (ts, id) covering index for keyset-paged trades
+-- Date: 2025-11-14
+-- Description: get_trades pages on the unique (ts, id) key, since several
+-- fills can share one ts. Rebuild the covering index with id as the second
+-- key column so `order by ts desc, id desc` is served by an index scan.
+
+create index if not exists idx_trades_ts_id_covering
+  on trades (ts desc, id desc) include (symbol, side, qty, price, fee, version_id);
+
+-- superseded by the (ts, id) index above
+drop index if exists idx_trades_ts_covering;
+
+analyze trades;
@@ -1,5 +1,5 @@
 from typing import List
-from schemas import Action, PlaceOrder
+from schemas import Action
 from hyperliquid_client import HyperliquidClient
 from db import Database
 import logging
@@ -17,28 +17,25 @@ class Executor:
 
     async def execute_action(self, action: Action) -> List[str]:
         """execute all orders and cancellations; return list of errors"""
+        # one signed request for all cancellations, then one for all orders; cancels
+        # land first since an order may reuse a cancelled client id
         errors = []
 
-        # process cancellations
-        for cancel in action.cancellations:
-            try:
-                if self.dry_run:
-                    logger.info(f"[dry-run] would cancel order {cancel.client_id}")
-                else:
-                    result = await self.hl_client.cancel_order(cancel.client_id)
-                    logger.info(f"cancelled order {cancel.client_id}: {result}")
-            except Exception as e:
-                err = f"cancel failed for {cancel.client_id}: {e}"
-                logger.error(err)
-                errors.append(err)
+        if action.cancellations:
+            client_ids = [cancel.client_id for cancel in action.cancellations]
+            if self.dry_run:
+                for client_id in client_ids:
+                    logger.info(f"[dry-run] would cancel order {client_id}")
+            else:
+                errors += await self._submit("cancel", client_ids, self.hl_client.cancel_orders(client_ids))
 
-        # process orders
-        for order in action.actions:
-            try:
-                if self.dry_run:
+        if action.actions:
+            if self.dry_run:
+                for order in action.actions:
                     logger.info(f"[dry-run] would place {order.side} {order.qty} {order.symbol} @ {order.limit_price}")
-                else:
-                    result = await self.hl_client.place_order(
+            else:
+                wires = [
+                    self.hl_client.order_wire(
                         symbol=order.symbol,
                         side=order.side,
                         qty=order.qty,
@@ -48,10 +45,31 @@ class Executor:
                         time_in_force=order.time_in_force,
                         client_id=order.client_id,
                     )
-                    logger.info(f"placed order {order.client_id}: {result}")
-            except Exception as e:
-                err = f"order failed for {order.client_id}: {e}"
+                    for order in action.actions
+                ]
+                client_ids = [order.client_id for order in action.actions]
+                errors += await self._submit("order", client_ids, self.hl_client.place_orders(wires))
+
+        return errors
+
+    async def _submit(self, kind: str, client_ids: List[str], request) -> List[str]:
+        """await a batched request and log / collect a result per client id"""
+        try:
+            result = await request
+        except Exception as e:
+            errors = [f"{kind} failed for {client_id}: {e}" for client_id in client_ids]
+            for err in errors:
                 logger.error(err)
-                errors.append(err)
+            return errors
 
+        errors = []
+        statuses = HyperliquidClient.batch_statuses(result)
+        for i, client_id in enumerate(client_ids):
+            status = statuses[i] if i < len(statuses) else result
+            if isinstance(status, dict) and "error" in status:
+                err = f"{kind} failed for {client_id}: {status['error']}"
+                logger.error(err)
+                errors.append(err)
+            else:
+                logger.info(f"{kind} {client_id}: {status}")
         return errors
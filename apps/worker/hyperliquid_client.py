@@ -1,14 +1,28 @@
 import httpx
-import json
+import orjson
 import time
 import hashlib
 import hmac
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from eth_account import Account
 from eth_account.messages import encode_defunct
 import asyncio
+import logging
 import websockets
 
+from indicators import Candles
+
+logger = logging.getLogger(__name__)
+
+MARKET_INFO_TTL = 3600.0  # seconds the universe metadata (tick size, min notional) is reused
+FUNDING_CACHE_TTL = 60.0  # seconds one asset-context fetch serves every symbol's funding rate
+BOOK_WAIT_TIMEOUT = 5.0  # seconds get_l2_book waits for a first streamed book before using rest
+BOOK_MAX_AGE = 5.0  # seconds a streamed book is served; older ones mean a silent feed, so rest is used
+
+# shared order-type sub-objects for order_wire; only ever serialized, never mutated
+_MARKET_ORDER_TYPE = {"market": {}}
+_LIMIT_ORDER_TYPES = {tif: {"limit": {"tif": tif}} for tif in ("GTC", "IOC", "ALO")}
+
 
 class HyperliquidClient:
     """minimal hyperliquid testnet client with rest and websocket helpers"""
@@ -18,22 +32,42 @@ class HyperliquidClient:
         self.api_secret = api_secret
         self.account = account
         self.base_url = base_url.rstrip('/')
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        # keyed hmac state built once; each signature copies it instead of redoing the key setup
+        self._hmac_template = hmac.new(api_secret.encode(), digestmod=hashlib.sha256)
+        # http/2 so concurrent /info calls multiplex over one tls connection
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+        )
+        # (fetched_at, symbol -> asset) from the last meta request, shared by all symbols
+        self._meta_cache: Optional[Tuple[float, Dict[str, Dict]]] = None
+        self._meta_lock = asyncio.Lock()
+        # (fetched_at, coin -> funding rate) from the last asset-context request
+        self._funding_cache: Optional[Tuple[float, Dict[str, float]]] = None
+        self._funding_lock = asyncio.Lock()
+        # (received_at, latest l2 book) per streamed symbol, kept current by _ws_loop (see start())
+        self._books: Dict[str, Tuple[float, Dict]] = {}
+        self._ws_connected = False
+        self._book_ready: Dict[str, asyncio.Event] = {}
+        self._ws_task: Optional[asyncio.Task] = None
 
-    def _sign_request(self, endpoint: str, payload: Dict) -> Dict[str, str]:
-        """generate signature for authenticated requests"""
+    def _sign_request(self, endpoint: str, payload: Dict) -> Tuple[Dict[str, str], bytes]:
+        """serialize and sign an authenticated request; returns (headers, body)"""
         timestamp = str(int(time.time() * 1000))
-        message = f"{timestamp}{endpoint}{json.dumps(payload, separators=(',', ':'))}"
-        signature = hmac.new(
-            self.api_secret.encode(),
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        return {
+        # compact json bytes; the exact signed bytes are sent as the body
+        body = orjson.dumps(payload)
+        mac = self._hmac_template.copy()
+        mac.update(f"{timestamp}{endpoint}".encode())
+        mac.update(body)
+        signature = mac.hexdigest()
+        headers = {
+            "Content-Type": "application/json",
             "X-API-KEY": self.api_key,
             "X-TIMESTAMP": timestamp,
             "X-SIGNATURE": signature,
         }
+        return headers, body
 
     async def get_account_state(self) -> Dict:
         """fetch account equity, positions, and balances"""
@@ -47,23 +81,74 @@ class HyperliquidClient:
         return resp.json()
 
     async def get_market_info(self, symbol: str) -> Dict:
-        """fetch market metadata including tick size and min notional"""
-        endpoint = "/info"
-        payload = {"type": "meta"}
-        resp = await self.http_client.post(
-            f"{self.base_url}{endpoint}",
-            json=payload,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        # find symbol in universe
-        for asset in data.get("universe", []):
-            if asset["name"] == symbol:
-                return asset
-        return {}
+        """fetch market metadata including tick size and min notional (cached for MARKET_INFO_TTL)"""
+        # the lock makes concurrent callers share one refresh
+        async with self._meta_lock:
+            if self._meta_cache is None or time.monotonic() - self._meta_cache[0] > MARKET_INFO_TTL:
+                endpoint = "/info"
+                payload = {"type": "meta"}
+                resp = await self.http_client.post(
+                    f"{self.base_url}{endpoint}",
+                    json=payload,
+                )
+                resp.raise_for_status()
+                data = resp.json()
+                universe = {asset["name"]: asset for asset in data.get("universe", [])}
+                self._meta_cache = (time.monotonic(), universe)
+        return self._meta_cache[1].get(symbol, {})
+
+    async def start(self, symbols: List[str]):
+        """stream l2 books for symbols over the websocket; get_l2_book then reads from memory"""
+        self._book_ready = {symbol: asyncio.Event() for symbol in symbols}
+        self._ws_task = asyncio.create_task(self._ws_loop(symbols))
+
+    async def _ws_loop(self, symbols: List[str]):
+        """keep the l2Book subscriptions alive, reconnecting with backoff"""
+        ws_url = self.base_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + "/ws"
+        retry_delay = 1
+        while True:
+            try:
+                async with websockets.connect(ws_url) as ws:
+                    for symbol in symbols:
+                        await ws.send(orjson.dumps(
+                            {"method": "subscribe", "subscription": {"type": "l2Book", "coin": symbol}}
+                        ).decode())
+                    retry_delay = 1
+                    self._ws_connected = True
+                    async for message in ws:
+                        msg = orjson.loads(message)
+                        if msg.get("channel") == "l2Book":
+                            book = msg["data"]
+                            self._books[book["coin"]] = (time.monotonic(), book)
+                            ready = self._book_ready.get(book["coin"])
+                            if ready is not None:
+                                ready.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"hyperliquid ws error: {e}, reconnecting in {retry_delay}s...")
+            # books go stale while disconnected; get_l2_book goes straight to rest until reconnected
+            self._ws_connected = False
+            self._books.clear()
+            for ready in self._book_ready.values():
+                ready.clear()
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 60)
 
     async def get_l2_book(self, symbol: str) -> Dict:
-        """fetch level 2 order book"""
+        """level 2 order book: the streamed copy when subscribed and fresh, otherwise a rest fetch"""
+        ready = self._book_ready.get(symbol)
+        if ready is not None and self._ws_connected:
+            if symbol not in self._books:
+                # just (re)connected: give the first snapshot a moment to arrive
+                try:
+                    await asyncio.wait_for(ready.wait(), BOOK_WAIT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    pass
+            entry = self._books.get(symbol)
+            if entry is not None and time.monotonic() - entry[0] <= BOOK_MAX_AGE:
+                return entry[1]
+
         endpoint = "/info"
         payload = {"type": "l2Book", "coin": symbol}
         resp = await self.http_client.post(
@@ -74,23 +159,36 @@ class HyperliquidClient:
         return resp.json()
 
     async def get_funding_rate(self, symbol: str) -> float:
-        """fetch current funding rate"""
-        endpoint = "/info"
-        payload = {"type": "metaAndAssetCtxs"}
-        resp = await self.http_client.post(
-            f"{self.base_url}{endpoint}",
-            json=payload,
+        """fetch current funding rate (all coins are cached together for FUNDING_CACHE_TTL)"""
+        # the lock makes concurrent callers share one refresh
+        async with self._funding_lock:
+            if self._funding_cache is None or time.monotonic() - self._funding_cache[0] > FUNDING_CACHE_TTL:
+                endpoint = "/info"
+                payload = {"type": "metaAndAssetCtxs"}
+                resp = await self.http_client.post(
+                    f"{self.base_url}{endpoint}",
+                    json=payload,
+                )
+                resp.raise_for_status()
+                data = resp.json()
+                # index funding from asset contexts by coin
+                funding = {
+                    ctx.get("coin"): float(ctx.get("funding", "0"))
+                    for ctx in data.get("assetContexts", [])
+                }
+                self._funding_cache = (time.monotonic(), funding)
+        return self._funding_cache[1].get(symbol, 0.0)
+
+    async def get_market_snapshot(self, symbol: str) -> Tuple[Dict, float]:
+        """fetch l2 book and funding rate for one symbol concurrently"""
+        book, funding_rate = await asyncio.gather(
+            self.get_l2_book(symbol),
+            self.get_funding_rate(symbol),
         )
-        resp.raise_for_status()
-        data = resp.json()
-        # extract funding from asset contexts
-        for ctx in data.get("assetContexts", []):
-            if ctx.get("coin") == symbol:
-                return float(ctx.get("funding", "0"))
-        return 0.0
-
-    async def get_candles(self, symbol: str, interval: str, lookback: int) -> List[List[float]]:
-        """fetch ohlcv candles; interval in minutes"""
+        return book, funding_rate
+
+    async def get_candles(self, symbol: str, interval: str, lookback: int) -> Candles:
+        """fetch ohlcv candles as column arrays; interval in minutes"""
         endpoint = "/info"
         payload = {
             "type": "candleSnapshot",
@@ -107,18 +205,37 @@ class HyperliquidClient:
         )
         resp.raise_for_status()
         data = resp.json()
-        # parse candles: [ts, open, high, low, close, volume]
-        candles = []
-        for c in data:
-            candles.append([
-                c["t"],
-                float(c["o"]),
-                float(c["h"]),
-                float(c["l"]),
-                float(c["c"]),
-                float(c.get("v", 0)),
-            ])
-        return candles
+        # parse candles into column arrays; numpy parses the string fields itself
+        return Candles.from_rows(
+            [(c["t"], c["o"], c["h"], c["l"], c["c"], c.get("v", 0)) for c in data]
+        )
+
+    def order_wire(
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        order_type: str,
+        limit_price: Optional[float] = None,
+        reduce_only: bool = False,
+        time_in_force: str = "gtc",
+        client_id: Optional[str] = None,
+    ) -> Dict:
+        """one entry of an /exchange order payload"""
+        if order_type == "market":
+            order_t = _MARKET_ORDER_TYPE
+        else:
+            tif = time_in_force.upper()
+            order_t = _LIMIT_ORDER_TYPES.get(tif) or {"limit": {"tif": tif}}
+        return {
+            "a": self.account,
+            "b": side.lower() == "buy",
+            "p": str(limit_price) if limit_price else "0",
+            "s": str(qty),
+            "r": reduce_only,
+            "t": order_t,
+            "c": client_id or "",
+        }
 
     async def place_order(
         self,
@@ -132,28 +249,22 @@ class HyperliquidClient:
         client_id: Optional[str] = None,
     ) -> Dict:
         """place an order on hyperliquid testnet"""
+        return await self.place_orders([
+            self.order_wire(symbol, side, qty, order_type, limit_price, reduce_only, time_in_force, client_id)
+        ])
+
+    async def place_orders(self, orders: List[Dict]) -> Dict:
+        """place several orders (each built with order_wire) in one signed request"""
         endpoint = "/exchange"
-        is_buy = side.lower() == "buy"
         payload = {
             "type": "order",
-            "orders": [{
-                "a": self.account,
-                "b": is_buy,
-                "p": str(limit_price) if limit_price else "0",
-                "s": str(qty),
-                "r": reduce_only,
-                "t": {"limit": {"tif": time_in_force.upper()}},
-                "c": client_id or "",
-            }],
+            "orders": orders,
             "grouping": "na",
         }
-        if order_type == "market":
-            payload["orders"][0]["t"] = {"market": {}}
-
-        headers = self._sign_request(endpoint, payload)
+        headers, body = self._sign_request(endpoint, payload)
         resp = await self.http_client.post(
             f"{self.base_url}{endpoint}",
-            json=payload,
+            content=body,
             headers=headers,
         )
         resp.raise_for_status()
@@ -161,22 +272,34 @@ class HyperliquidClient:
 
     async def cancel_order(self, client_id: str) -> Dict:
         """cancel order by client id"""
+        return await self.cancel_orders([client_id])
+
+    async def cancel_orders(self, client_ids: List[str]) -> Dict:
+        """cancel several orders by client id in one signed request"""
         endpoint = "/exchange"
         payload = {
             "type": "cancel",
-            "cancels": [{
-                "a": self.account,
-                "o": client_id,
-            }]
+            "cancels": [{"a": self.account, "o": client_id} for client_id in client_ids],
         }
-        headers = self._sign_request(endpoint, payload)
+        headers, body = self._sign_request(endpoint, payload)
         resp = await self.http_client.post(
             f"{self.base_url}{endpoint}",
-            json=payload,
+            content=body,
             headers=headers,
         )
         resp.raise_for_status()
         return resp.json()
 
+    @staticmethod
+    def batch_statuses(result: Dict) -> List[Any]:
+        """per-order statuses of a batched /exchange response, in request order"""
+        response = result.get("response")
+        if not isinstance(response, dict):
+            return []
+        return response.get("data", {}).get("statuses", [])
+
     async def close(self):
+        if self._ws_task:
+            self._ws_task.cancel()
+            self._ws_connected = False
         await self.http_client.aclose()
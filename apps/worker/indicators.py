@@ -1,39 +1,116 @@
 """Technical indicator calculations"""
 import numpy as np
-from typing import List, Tuple
+from scipy.signal import lfilter
+from typing import List, NamedTuple, Sequence, Tuple, Union
 
 
-def calculate_ema(prices: List[float], period: int) -> List[float]:
-    """
-    Calculate Exponential Moving Average
+class Candles(NamedTuple):
+    """ohlcv candles as one float64 column array per field (oldest to newest)"""
+    ts: np.ndarray
+    o: np.ndarray
+    h: np.ndarray
+    l: np.ndarray
+    c: np.ndarray
+    v: np.ndarray
 
-    Args:
-        prices: List of prices (oldest to newest)
-        period: EMA period (e.g., 20)
+    @classmethod
+    def from_rows(cls, rows: Union[Sequence[Sequence[float]], np.ndarray]) -> "Candles":
+        """build from [[timestamp, open, high, low, close, volume], ...] rows"""
+        table = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+        return cls(*(np.ascontiguousarray(table[:, i]) for i in range(6)))
 
-    Returns:
-        List of EMA values (same length as prices)
-    """
+    def to_list(self) -> List[List[float]]:
+        """the row format older callers expect"""
+        return np.column_stack(self).tolist()
+
+
+# array kernels: float64 ndarray in, full-length ndarray out. the public functions
+# below wrap them for lists; get_recent_indicators shares inputs across them
+
+
+def _ema(prices: np.ndarray, period: int) -> np.ndarray:
+    """ema over a float64 array, front-padded with the seed sma"""
     if len(prices) < period:
-        return [prices[-1]] * len(prices) if prices else []
+        return np.full(len(prices), prices[-1]) if len(prices) else np.empty(0)
 
-    prices_array = np.array(prices)
-    ema = np.zeros_like(prices_array)
+    ema = np.empty_like(prices)
 
     # First EMA value is SMA
-    ema[period - 1] = np.mean(prices_array[:period])
+    ema[period - 1] = np.mean(prices[:period])
 
     # Calculate multiplier
     multiplier = 2 / (period + 1)
 
-    # Calculate EMA for remaining values
-    for i in range(period, len(prices)):
-        ema[i] = (prices_array[i] - ema[i-1]) * multiplier + ema[i-1]
+    # ema[i] = multiplier * price[i] + (1 - multiplier) * ema[i-1], run as a first-order
+    # iir filter seeded from the sma
+    if len(prices) > period:
+        decay = 1.0 - multiplier
+        ema[period:] = lfilter(
+            [multiplier], [1.0, -decay], prices[period:], zi=[ema[period - 1] * decay]
+        )[0]
 
     # Fill initial values with first EMA value
     ema[:period-1] = ema[period-1]
 
-    return ema.tolist()
+    return ema
+
+
+def _macd(prices: np.ndarray, fast: int, slow: int, signal: int) -> np.ndarray:
+    """macd histogram as percentage of price over a float64 array"""
+    if len(prices) < slow:
+        return np.zeros(len(prices))
+
+    # MACD line = Fast EMA - Slow EMA; signal line = EMA of MACD line
+    macd_line = _ema(prices, fast) - _ema(prices, slow)
+    signal_line = _ema(macd_line, signal)
+
+    # MACD histogram = MACD line - Signal line
+    # Convert to percentage of price for comparability across assets
+    return np.divide(
+        (macd_line - signal_line) * 100, prices, out=np.zeros_like(prices), where=prices != 0
+    )
+
+
+def _rsi(gains: np.ndarray, losses: np.ndarray, period: int) -> np.ndarray:
+    """rsi from per-step gains / losses (len(prices) - 1 each); callers ensure len >= period"""
+    # Wilder smoothing avg = (avg * (period - 1) + x) / period is a first-order iir
+    # with alpha = 1 / period, seeded from the simple averages of the first window
+    alpha = 1.0 / period
+    decay = 1.0 - alpha
+    avg_gain = np.empty(len(gains) - period + 1)
+    avg_loss = np.empty_like(avg_gain)
+    avg_gain[0] = np.mean(gains[:period])
+    avg_loss[0] = np.mean(losses[:period])
+    if len(gains) > period:
+        avg_gain[1:] = lfilter([alpha], [1.0, -decay], gains[period:], zi=[avg_gain[0] * decay])[0]
+        avg_loss[1:] = lfilter([alpha], [1.0, -decay], losses[period:], zi=[avg_loss[0] * decay])[0]
+
+    # first `period` values stay neutral; 100 wherever there were no losses
+    rsi_values = np.full(len(gains) + 1, 50.0)
+    rs = np.divide(avg_gain, avg_loss, out=np.zeros_like(avg_gain), where=avg_loss != 0)
+    rsi_values[period:] = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + rs)))
+
+    return rsi_values
+
+
+def _gains_losses(prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """split price changes into gains and losses (both non-negative)"""
+    deltas = np.diff(prices)
+    return np.where(deltas > 0, deltas, 0.0), np.where(deltas < 0, -deltas, 0.0)
+
+
+def calculate_ema(prices: List[float], period: int) -> List[float]:
+    """
+    Calculate Exponential Moving Average
+
+    Args:
+        prices: List of prices (oldest to newest)
+        period: EMA period (e.g., 20)
+
+    Returns:
+        List of EMA values (same length as prices)
+    """
+    return _ema(np.asarray(prices, dtype=np.float64), period).tolist()
 
 
 def calculate_macd(prices: List[float], fast: int = 12, slow: int = 26, signal: int = 9) -> List[float]:
@@ -49,29 +126,7 @@ def calculate_macd(prices: List[float], fast: int = 12, slow: int = 26, signal:
     Returns:
         List of MACD histogram values as percentage of price (comparable across assets)
     """
-    if len(prices) < slow:
-        return [0.0] * len(prices)
-
-    fast_ema = calculate_ema(prices, fast)
-    slow_ema = calculate_ema(prices, slow)
-
-    # MACD line = Fast EMA - Slow EMA
-    macd_line = [fast_ema[i] - slow_ema[i] for i in range(len(prices))]
-
-    # Signal line = EMA of MACD line
-    signal_line = calculate_ema(macd_line, signal)
-
-    # MACD histogram = MACD line - Signal line
-    # Convert to percentage of price for comparability across assets
-    macd_histogram = []
-    for i in range(len(prices)):
-        if prices[i] != 0:
-            macd_pct = ((macd_line[i] - signal_line[i]) / prices[i]) * 100
-            macd_histogram.append(macd_pct)
-        else:
-            macd_histogram.append(0.0)
-
-    return macd_histogram
+    return _macd(np.asarray(prices, dtype=np.float64), fast, slow, signal).tolist()
 
 
 def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
@@ -88,83 +143,36 @@ def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
     if len(prices) < period + 1:
         return [50.0] * len(prices)
 
-    prices_array = np.array(prices)
-
-    # Calculate price changes
-    deltas = np.diff(prices_array)
-
-    # Separate gains and losses
-    gains = np.where(deltas > 0, deltas, 0)
-    losses = np.where(deltas < 0, -deltas, 0)
-
-    # Calculate average gains and losses
-    rsi_values = [50.0]  # First value is neutral
-
-    # Initial averages
-    avg_gain = np.mean(gains[:period])
-    avg_loss = np.mean(losses[:period])
-
-    if avg_loss == 0:
-        rsi_values.append(100.0)
-    else:
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        rsi_values.append(rsi)
-
-    # Calculate RSI for remaining values using smoothed averages
-    for i in range(period, len(deltas)):
-        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-
-        if avg_loss == 0:
-            rsi_values.append(100.0)
-        else:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            rsi_values.append(rsi)
+    gains, losses = _gains_losses(np.asarray(prices, dtype=np.float64))
+    return _rsi(gains, losses, period).tolist()
 
-    # Pad beginning with first calculated value
-    while len(rsi_values) < len(prices):
-        rsi_values.insert(0, rsi_values[0])
 
-    return rsi_values
-
-
-def calculate_atr(ohlcv: List[List[float]], period: int = 14) -> List[float]:
+def calculate_atr(ohlcv: Union[Candles, List[List[float]]], period: int = 14) -> List[float]:
     """
     Calculate Average True Range
 
     Args:
-        ohlcv: List of OHLCV candles [[timestamp, open, high, low, close, volume], ...]
+        ohlcv: Candles, or list of OHLCV candles [[timestamp, open, high, low, close, volume], ...]
         period: ATR period (default 14)
 
     Returns:
         List of ATR values
     """
-    if len(ohlcv) < period:
-        return [0.0] * len(ohlcv)
-
-    true_ranges = []
-    for i in range(len(ohlcv)):
-        high = ohlcv[i][2]
-        low = ohlcv[i][3]
-
-        if i == 0:
-            # First candle: true range is just high - low
-            true_ranges.append(high - low)
-        else:
-            prev_close = ohlcv[i-1][4]
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            true_ranges.append(tr)
+    candles = ohlcv if isinstance(ohlcv, Candles) else Candles.from_rows(ohlcv)
+    if len(candles.ts) < period:
+        return [0.0] * len(candles.ts)
 
-    # Calculate ATR using EMA of true ranges
-    atr = calculate_ema(true_ranges, period)
+    high, low, close = candles.h, candles.l, candles.c
 
-    return atr
+    # true range against the previous close; the first candle is just high - low
+    prev_close = np.empty_like(close)
+    prev_close[0] = low[0]
+    prev_close[1:] = close[:-1]
+    true_ranges = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_ranges[0] = high[0] - low[0]
+
+    # Calculate ATR using EMA of true ranges
+    return _ema(true_ranges, period).tolist()
 
 
 def get_recent_indicators(prices: List[float], count: int = 10) -> Tuple[List[float], List[float], List[float], List[float]]:
@@ -181,15 +189,19 @@ def get_recent_indicators(prices: List[float], count: int = 10) -> Tuple[List[fl
     if len(prices) < 2:
         return ([], [], [], [])
 
-    ema_20 = calculate_ema(prices, 20)
-    macd = calculate_macd(prices, 12, 26, 9)
-    rsi_7 = calculate_rsi(prices, 7)
-    rsi_14 = calculate_rsi(prices, 14)
+    # one array conversion and one gains / losses split shared by every indicator;
+    # only the last `count` values are turned back into lists
+    prices_array = np.asarray(prices, dtype=np.float64)
+    gains, losses = _gains_losses(prices_array)
+
+    def rsi(period: int) -> np.ndarray:
+        if len(prices_array) < period + 1:
+            return np.full(len(prices_array), 50.0)
+        return _rsi(gains, losses, period)
 
-    # Return most recent 'count' values
     return (
-        ema_20[-count:] if len(ema_20) >= count else ema_20,
-        macd[-count:] if len(macd) >= count else macd,
-        rsi_7[-count:] if len(rsi_7) >= count else rsi_7,
-        rsi_14[-count:] if len(rsi_14) >= count else rsi_14
+        _ema(prices_array, 20)[-count:].tolist(),
+        _macd(prices_array, 12, 26, 9)[-count:].tolist(),
+        rsi(7)[-count:].tolist(),
+        rsi(14)[-count:].tolist(),
     )
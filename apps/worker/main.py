@@ -1,4 +1,5 @@
 import asyncio
+import itertools
 import logging
 from datetime import datetime
 import uuid
@@ -13,7 +14,7 @@ from reconciler import Reconciler
 from schemas import (
     Observation, MarketObservation, BookTop, Account, Position,
     Limits, Scoreboard, Action, TechnicalIndicators, FourHourContext,
-    CompletedTrade, MarketRegime
+    CompletedTrade, MarketRegime, ExitPlan, PerformanceMetrics
 )
 from adapters import (
     BrokerAdapter, HyperliquidAdapter, PerpSimAdapter, PerpSimConfig,
@@ -21,7 +22,7 @@ from adapters import (
 )
 from market import CoinbaseWebSocket
 from market.coinbase_rest import prefill_candle_buffers
-from indicators import get_recent_indicators, calculate_ema, calculate_macd, calculate_rsi, calculate_atr
+from indicators import Candles, get_recent_indicators, calculate_ema, calculate_macd, calculate_rsi, calculate_atr
 from position_manager import PositionManager
 from prompt_formatter import format_observation
 from regime import RegimeAnalyzer
@@ -32,6 +33,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# perps traded on the hyperliquid backend (perpsim trades settings.sim_symbols)
+HYPERLIQUID_SYMBOLS = ["BTC-PERP", "ETH-PERP"]
+
 
 class AgentWorker:
     """main agent loop: observe, plan, execute, reconcile"""
@@ -47,11 +51,19 @@ class AgentWorker:
         self.perpsim_symbols = None
         if settings.trading_backend == "perpsim":
             self.perpsim_symbols = settings.sim_symbols.split(",")
+        # symbols observed and traded this run
+        self.symbols = self.perpsim_symbols or HYPERLIQUID_SYMBOLS
 
         self.llm_client = OpenRouterClient()
 
-        # validator uses adapter limits
+        # validator uses adapter limits; they're static config, so the observation's
+        # copy is built once here too
         limits = self.adapter.limits()
+        self._observation_limits = Limits(
+            min_notional=limits.min_notional,
+            tick_size=limits.tick_size,
+            max_leverage=limits.max_leverage,
+        )
 
         # build tick sizes map for all supported symbols (use per-symbol tick sizes)
         tick_sizes = settings.tick_sizes
@@ -84,6 +96,16 @@ class AgentWorker:
         self.client_id_aliases = {}
         self.actual_to_original = {}
         self.pending_aliases = {}
+        self._pending_by_original = {}  # inverse of pending_aliases: original -> latest actual
+        self._client_id_suffix = itertools.count(1)  # disambiguates colliding client ids
+        self._last_market_prices = {}  # symbol -> mark from the latest build_observation
+
+        # version tagging / performance run off the cycle's critical path: at most one run
+        # executing and one queued behind it; later requests fold into the queued run
+        self._bookkeeping_lock = asyncio.Lock()
+        self._bookkeeping_queued = False
+        self._bookkeeping_version = None  # version whose performance the queued run refreshes
+        self._bookkeeping_tasks = set()
 
         # tracking for observation
         self.start_time = datetime.utcnow()
@@ -150,16 +172,19 @@ class AgentWorker:
     def _normalize_action_client_ids(self, action_dict: dict) -> dict:
         """ensure client ids are unique and cancellations reference active ids"""
         self.pending_aliases = {}
+        self._pending_by_original = {}
         seen_ids = set()
         actions = action_dict.get("actions", []) or []
         for order in actions:
             original = order.get("client_id") or str(uuid.uuid4())
             actual = original
+            # collisions are rare; suffix from a counter rather than drawing a uuid per retry
             while actual in seen_ids or actual in self.used_client_ids:
-                actual = f"{original}-{uuid.uuid4().hex[:8]}"
+                actual = f"{original}-{next(self._client_id_suffix)}"
             order["client_id"] = actual
             seen_ids.add(actual)
             self.pending_aliases[actual] = original
+            self._pending_by_original[original] = actual
 
         for cancel in action_dict.get("cancellations", []) or []:
             resolved = self._resolve_client_id(cancel.get("client_id"))
@@ -176,10 +201,7 @@ class AgentWorker:
         aliases = self.client_id_aliases.get(client_id)
         if aliases:
             return aliases[-1]
-        for actual, original in reversed(list(self.pending_aliases.items())):
-            if original == client_id:
-                return actual
-        return client_id
+        return self._pending_by_original.get(client_id, client_id)
 
     def _register_client_id(self, actual_id: str):
         """record a client id after a successful placement"""
@@ -213,7 +235,7 @@ class AgentWorker:
         config_snapshot = {
             "model": settings.openrouter_model,
             "trading_backend": settings.trading_backend,
-            "symbols": settings.sim_symbols if settings.trading_backend == "perpsim" else "BTC-PERP,ETH-PERP",
+            "symbols": ",".join(self.symbols),
             "max_leverage": settings.max_leverage,
             "cycle_interval": settings.cycle_interval_seconds,
         }
@@ -227,6 +249,10 @@ class AgentWorker:
 
         logger.info(f"Running as version {settings.agent_version} (id={self.version_id})")
 
+        # stream order books instead of polling them every cycle
+        if settings.trading_backend == "hyperliquid":
+            await self.adapter.hl_client.start(self.symbols)
+
         # pre-fill historical candles and start coinbase ws if using perpsim
         if self.perpsim_symbols:
             logger.info(f"Pre-filling historical candles for {self.perpsim_symbols}...")
@@ -274,6 +300,9 @@ class AgentWorker:
 
     async def cleanup(self):
         """cleanup resources"""
+        # let in-flight bookkeeping finish before the pools close
+        if self._bookkeeping_tasks:
+            await asyncio.gather(*self._bookkeeping_tasks, return_exceptions=True)
         if self.coinbase_ws:
             await self.coinbase_ws.close()
         await self.adapter.close()
@@ -289,13 +318,20 @@ class AgentWorker:
         try:
             # 1. build observation
             obs = await self.build_observation()
-            logger.info(f"observation: {obs.model_dump_json()}")
 
-            # Format observation as string for saving
-            observation_str = format_observation(obs)
+            # format for the prompt / saving off the event loop, so websocket ticks keep
+            # flowing meanwhile; the full json dump is only built when debug logging is on
+            if logger.isEnabledFor(logging.DEBUG):
+                observation_json, observation_str = await asyncio.gather(
+                    asyncio.to_thread(obs.model_dump_json),
+                    asyncio.to_thread(format_observation, obs),
+                )
+                logger.debug("observation: %s", observation_json)
+            else:
+                observation_str = await asyncio.to_thread(format_observation, obs)
 
             # 2. call llm
-            action_dict = await self.llm_client.get_action(obs)
+            action_dict = await self.llm_client.get_action(obs, observation_str)
             logger.info(f"llm action: {action_dict}")
 
             # 3. detect action format and validate
@@ -313,21 +349,23 @@ class AgentWorker:
                 notes_for_audience = position_action.notes_for_audience
 
                 # 4. execute using position manager
-                # Build market prices from observation
-                market_prices = {m.symbol: m.mid for m in obs.markets}
+                # market prices the observation was built from (mid == mark)
+                market_prices = self._last_market_prices
 
                 # Store exit plans and justifications BEFORE executing trades
                 # so they're available when trades are recorded
+                metadata_writes = {}
                 for coin, decision in position_action.positions.items():
                     symbol = f"{coin}-USD"
                     exit_plan_dict = decision.exit_plan.model_dump() if decision.exit_plan else None
-                    await self.db.set_metadata(f"exit_plan_{symbol}", exit_plan_dict)
+                    metadata_writes[f"exit_plan_{symbol}"] = exit_plan_dict
 
                     # Store justification for trade recording
                     # Only store if signal is not "hold" - hold signals don't result in trades
                     # and their justifications would be misleading if used for future trades
                     if decision.signal != "hold":
-                        await self.db.set_metadata(f"justification_{symbol}", decision.justification)
+                        metadata_writes[f"justification_{symbol}"] = decision.justification
+                await self.db.set_metadata_many(metadata_writes)
 
                 exec_errors = await self.position_manager.execute_position_decisions(
                     position_action.positions,
@@ -382,8 +420,9 @@ class AgentWorker:
             )
 
             # 6. reconcile positions and equity
-            await asyncio.sleep(2)  # wait for fills
+            # perpsim records market fills inside place_order, so only the exchange needs a fill window
             if settings.trading_backend == "hyperliquid":
+                await asyncio.sleep(2)  # wait for fills
                 await self.reconciler.reconcile()
             else:
                 await self.adapter.reconcile()
@@ -391,13 +430,8 @@ class AgentWorker:
             # 7. update scoreboard metadata
             await self.update_scoreboard()
 
-            # 8. update version tags for all records
-            await self.db.update_current_version_tags()
-
-            # 9. calculate current version performance (every 10 cycles)
-            if self.invocation_count % 10 == 0:
-                if self.version_id:
-                    await self.db.calculate_version_performance(self.version_id)
+            # 8-9. version tags and (every 10 cycles) version performance, in the background
+            self._spawn_bookkeeping(self.version_id if self.invocation_count % 10 == 0 else None)
 
         except Exception as e:
             logger.error(f"cycle error: {e}", exc_info=True)
@@ -405,8 +439,37 @@ class AgentWorker:
             await self.db.set_metadata("last_error", str(e))
 
         self.pending_aliases.clear()
+        self._pending_by_original.clear()
         logger.info(f"=== cycle {cycle_id} end ===")
 
+    def _spawn_bookkeeping(self, version_id):
+        """tag records with the current version, then refresh version_id's performance if set"""
+        if version_id:
+            self._bookkeeping_version = version_id
+        # a queued run hasn't started yet, and tagging picks up every untagged row,
+        # so it covers this cycle too
+        if self._bookkeeping_queued:
+            return
+        self._bookkeeping_queued = True
+        task = asyncio.create_task(self._run_bookkeeping())
+        self._bookkeeping_tasks.add(task)
+        task.add_done_callback(self._bookkeeping_done)
+
+    async def _run_bookkeeping(self):
+        async with self._bookkeeping_lock:
+            # from here on, new requests queue a fresh run behind this one
+            self._bookkeeping_queued = False
+            version_id, self._bookkeeping_version = self._bookkeeping_version, None
+            # tags first: performance reads the freshly tagged rows
+            await self.db.update_current_version_tags()
+            if version_id:
+                await self.db.calculate_version_performance(version_id)
+
+    def _bookkeeping_done(self, task: asyncio.Task):
+        self._bookkeeping_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"bookkeeping error: {task.exception()}", exc_info=task.exception())
+
     async def _execute_via_adapter(self, action: Action) -> list[str]:
         """execute actions using adapter (for perpsim mode)"""
         errors = []
@@ -449,93 +512,99 @@ class AgentWorker:
 
     async def build_observation(self) -> Observation:
         """build observation json from market and account data"""
-        # determine symbols based on backend
-        if settings.trading_backend == "perpsim":
-            symbols = settings.sim_symbols.split(",")
-        else:
-            symbols = ["BTC-PERP", "ETH-PERP"]
-
-        # fetch market data via adapter
-        market_state = await self.adapter.get_market_state(symbols)
+        # fetch market and account data via adapter (independent, so concurrently)
+        market_state, account_state = await asyncio.gather(
+            self.adapter.get_market_state(self.symbols),
+            self.adapter.get_account_state(),
+        )
         markets = []
+        # symbol -> mark, built in the same pass; run_cycle reuses it via _last_market_prices
+        market_prices = {}
 
         for mkt in market_state.markets:
-            logger.debug(f"Building observation for {mkt.symbol}: mark={mkt.mark:.2f}, bid={mkt.best_bid:.2f}, ask={mkt.best_ask:.2f}")
+            market_prices[mkt.symbol] = mkt.mark
+            logger.debug("Building observation for %s: mark=%.2f, bid=%.2f, ask=%.2f", mkt.symbol, mkt.mark, mkt.best_bid, mkt.best_ask)
             # get candles from coinbase ws if perpsim, otherwise from hyperliquid
             if self.coinbase_ws:
                 ohlcv_1m = self.coinbase_ws.get_candles(mkt.symbol)
             else:
                 # fallback: fetch from hyperliquid (if available)
                 # this is a simplified approach; in production you'd want a cleaner abstraction
-                ohlcv_1m = []
+                ohlcv_1m = np.empty((0, 6))
+
+            # one conversion to column arrays; closes are shared by realized vol and the indicators.
+            # only this parse is guarded: the math below is masked and doesn't raise on bad data
+            try:
+                close_prices = Candles.from_rows(ohlcv_1m).c
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Malformed 1m candles for {mkt.symbol}: {e}")
+                close_prices = np.empty(0)
 
-            # realized vol (simplified from candles)
+            # realized vol (simplified from candles): std of the last 15 log returns
             realized_vol = 0.0
-            if len(ohlcv_1m) >= 15:
-                try:
-                    returns = [np.log(ohlcv_1m[i][4] / ohlcv_1m[i-1][4]) for i in range(-15, 0)]
-                    realized_vol = np.std(returns) * np.sqrt(60 * 24 * 365)
-                except:
-                    realized_vol = 0.0
+            if len(close_prices) >= 16:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    vol = float(np.std(np.diff(np.log(close_prices[-16:]))) * np.sqrt(60 * 24 * 365))
+                # non-positive closes give inf / nan; treat those like missing data
+                if np.isfinite(vol):
+                    realized_vol = vol
 
             # calculate technical indicators from close prices
             tech_indicators = None
-            if len(ohlcv_1m) >= 30:  # need sufficient data
-                try:
-                    close_prices = [candle[4] for candle in ohlcv_1m]  # close is index 4
-                    ema_20, macd, rsi_7, rsi_14 = get_recent_indicators(close_prices, count=10)
-
-                    if len(ema_20) > 0:
-                        tech_indicators = TechnicalIndicators(
-                            ema_20=ema_20,
-                            macd=macd,
-                            rsi_7=rsi_7,
-                            rsi_14=rsi_14,
-                            current_ema_20=ema_20[-1],
-                            current_macd=macd[-1],
-                            current_rsi_7=rsi_7[-1],
-                        )
-                except Exception as e:
-                    logger.warning(f"Failed to calculate indicators for {mkt.symbol}: {e}")
+            if len(close_prices) >= 30:  # need sufficient data
+                ema_20, macd, rsi_7, rsi_14 = get_recent_indicators(close_prices, count=10)
+
+                # indicator outputs are already python floats; skip re-validating them
+                tech_indicators = TechnicalIndicators.model_construct(
+                    ema_20=ema_20,
+                    macd=macd,
+                    rsi_7=rsi_7,
+                    rsi_14=rsi_14,
+                    current_ema_20=ema_20[-1],
+                    current_macd=macd[-1],
+                    current_rsi_7=rsi_7[-1],
+                )
 
             # calculate 6-hour context indicators (Coinbase doesn't support 4h, so we use 6h)
             four_hour_context = None
             if self.coinbase_ws:
                 ohlcv_4h = self.coinbase_ws.get_4h_candles(mkt.symbol)
-                if len(ohlcv_4h) >= 50:  # need sufficient data for 50-period EMA
-                    try:
-                        close_prices_4h = [candle[4] for candle in ohlcv_4h]
-                        volumes_4h = [candle[5] for candle in ohlcv_4h]
-
-                        # Calculate EMAs
-                        ema_20_4h = calculate_ema(close_prices_4h, 20)
-                        ema_50_4h = calculate_ema(close_prices_4h, 50)
-
-                        # Calculate ATRs
-                        atr_3_4h = calculate_atr(ohlcv_4h, 3)
-                        atr_14_4h = calculate_atr(ohlcv_4h, 14)
-
-                        # Calculate MACD and RSI series (last 10 values)
-                        macd_4h = calculate_macd(close_prices_4h, 12, 26, 9)
-                        rsi_14_4h = calculate_rsi(close_prices_4h, 14)
-
-                        # Volume stats - filter out zeros from live candles that don't have volume
-                        volumes_nonzero = [v for v in volumes_4h if v > 0]
-                        current_volume = volumes_4h[-1] if volumes_4h else 0.0
-                        avg_volume = np.mean(volumes_nonzero) if volumes_nonzero else 0.0
-
-                        four_hour_context = FourHourContext(
-                            ema_20=ema_20_4h[-1] if len(ema_20_4h) > 0 else 0.0,
-                            ema_50=ema_50_4h[-1] if len(ema_50_4h) > 0 else 0.0,
-                            atr_3=atr_3_4h[-1] if len(atr_3_4h) > 0 else 0.0,
-                            atr_14=atr_14_4h[-1] if len(atr_14_4h) > 0 else 0.0,
-                            current_volume=current_volume,
-                            avg_volume=avg_volume,
-                            macd=macd_4h[-10:] if len(macd_4h) >= 10 else macd_4h,
-                            rsi_14=rsi_14_4h[-10:] if len(rsi_14_4h) >= 10 else rsi_14_4h,
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to calculate 6H indicators for {mkt.symbol}: {e}")
+                try:
+                    candles_4h = Candles.from_rows(ohlcv_4h)
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"Malformed 6H candles for {mkt.symbol}: {e}")
+                    candles_4h = Candles.from_rows([])
+                if len(candles_4h.ts) >= 50:  # need sufficient data for 50-period EMA
+                    close_prices_4h = candles_4h.c
+                    volumes_4h = candles_4h.v
+
+                    # Calculate EMAs
+                    ema_20_4h = calculate_ema(close_prices_4h, 20)
+                    ema_50_4h = calculate_ema(close_prices_4h, 50)
+
+                    # Calculate ATRs
+                    atr_3_4h = calculate_atr(candles_4h, 3)
+                    atr_14_4h = calculate_atr(candles_4h, 14)
+
+                    # Calculate MACD and RSI series (last 10 values)
+                    macd_4h = calculate_macd(close_prices_4h, 12, 26, 9)
+                    rsi_14_4h = calculate_rsi(close_prices_4h, 14)
+
+                    # Volume stats - filter out zeros from live candles that don't have volume
+                    volumes_nonzero = volumes_4h[volumes_4h > 0]
+                    current_volume = float(volumes_4h[-1])
+                    avg_volume = float(volumes_nonzero.mean()) if len(volumes_nonzero) else 0.0
+
+                    four_hour_context = FourHourContext.model_construct(
+                        ema_20=ema_20_4h[-1],
+                        ema_50=ema_50_4h[-1],
+                        atr_3=atr_3_4h[-1],
+                        atr_14=atr_14_4h[-1],
+                        current_volume=current_volume,
+                        avg_volume=avg_volume,
+                        macd=macd_4h[-10:],
+                        rsi_14=rsi_14_4h[-10:],
+                    )
 
             # Open interest: Only available for real perp exchanges, not Coinbase spot
             # Set to None for Coinbase data to avoid misleading the LLM with zeros
@@ -546,7 +615,8 @@ class AgentWorker:
                 symbol=mkt.symbol,
                 mid=mkt.mark,
                 spread_bps=mkt.spread_bps,
-                ohlcv_1m=ohlcv_1m,
+                # a snapshot (the ws buffer keeps updating), with ms timestamps back as ints
+                ohlcv_1m=[[int(row[0]), *row[1:]] for row in ohlcv_1m.tolist()],
                 realized_vol_15m=realized_vol,
                 book_top=BookTop(bid_qty=mkt.bid_qty, ask_qty=mkt.ask_qty),
                 funding_8h_rate=mkt.funding_8h_rate,
@@ -556,16 +626,22 @@ class AgentWorker:
                 four_hour_context=four_hour_context,
             ))
 
-        # fetch account data via adapter
-        account_state = await self.adapter.get_account_state()
-
         # update initial equity on first observation
         if self.invocation_count == 1:
             self.initial_equity = account_state.equity
 
-        # build market price map for positions
-        market_prices = {m.symbol: m.mark for m in market_state.markets}
+        self._last_market_prices = market_prices
+
+        # every position's exit plan in one metadata read
+        exit_plans = await self.db.get_metadata_many(
+            [f"exit_plan_{pos.symbol}" for pos in account_state.positions]
+        )
 
+        # margin usage accumulates in the same pass:
+        # used_margin = sum of initial margin for all positions
+        # initial margin = notional / leverage (for cross-margin)
+        used_margin = 0.0
+        now = datetime.utcnow()
         positions = []
         for pos in account_state.positions:
             current_price = market_prices.get(pos.symbol, pos.avg_entry)
@@ -573,11 +649,11 @@ class AgentWorker:
             # Use stored leverage from position
             leverage = pos.leverage
 
-            # calculate unrealized P&L
-            if pos.qty > 0:
-                unrealized_pnl = pos.qty * (current_price - pos.avg_entry)
-            else:
-                unrealized_pnl = pos.qty * (current_price - pos.avg_entry)
+            # calculate unrealized P&L (signed qty covers both sides)
+            unrealized_pnl = pos.qty * (current_price - pos.avg_entry)
+
+            if leverage and leverage > 0:
+                used_margin += abs(pos.qty) * current_price / leverage
 
             # estimate liquidation price (simplified)
             # for long: liq = entry * (1 - 1/leverage * maintenance_margin_fraction)
@@ -591,14 +667,13 @@ class AgentWorker:
             entry_time = getattr(pos, 'entry_time', None)
             holding_time_minutes = None
             if entry_time:
-                holding_time_minutes = int((datetime.utcnow() - entry_time).total_seconds() / 60)
+                holding_time_minutes = int((now - entry_time).total_seconds() / 60)
 
             # Get exit plan from metadata
-            exit_plan_dict = await self.db.get_metadata(f"exit_plan_{pos.symbol}")
+            exit_plan_dict = exit_plans[f"exit_plan_{pos.symbol}"]
             exit_plan = None
             if exit_plan_dict:
                 try:
-                    from schemas import ExitPlan
                     exit_plan = ExitPlan(**exit_plan_dict)
                 except Exception as e:
                     logger.warning(f"Failed to parse exit plan for {pos.symbol}: {e}")
@@ -621,16 +696,6 @@ class AgentWorker:
         if self.initial_equity > 0:
             total_return_pct = ((account_state.equity - self.initial_equity) / self.initial_equity) * 100
 
-        # calculate margin usage
-        # used_margin = sum of initial margin for all positions
-        # initial margin = notional / leverage (for cross-margin)
-        used_margin = 0.0
-        for pos in positions:
-            notional = abs(pos.qty) * pos.current_price
-            # Use the minimum of actual leverage or max leverage for margin calculation
-            if pos.leverage and pos.leverage > 0:
-                used_margin += notional / pos.leverage
-
         # available margin = equity - used_margin
         available_margin = max(0, account_state.equity - used_margin)
 
@@ -645,25 +710,26 @@ class AgentWorker:
             total_return_pct=total_return_pct,
         )
 
-        # get limits from adapter
-        adapter_limits = self.adapter.limits()
-        limits = Limits(
-            min_notional=adapter_limits.min_notional,
-            tick_size=adapter_limits.tick_size,
-            max_leverage=adapter_limits.max_leverage,
-        )
+        # limits from adapter (built once in __init__)
+        limits = self._observation_limits
 
         # scoreboard with performance metrics
         pnl_all_time = account_state.realized_pl + account_state.unrealized_pl
 
-        # Calculate comprehensive performance metrics for current version only
-        perf_metrics_dict = await self.db.calculate_performance_metrics(version_id=self.version_id)
-        sharpe_30d = await self.db.calculate_sharpe_ratio(days=30, version_id=self.version_id)
-        max_dd = await self.db.calculate_max_drawdown(version_id=self.version_id)
-        per_symbol_perf = await self.db.calculate_per_symbol_performance(version_id=self.version_id)
+        # Calculate comprehensive performance metrics for current version only, update
+        # market prices and fetch recent completed trades (last 10), all concurrently
+        (
+            perf_metrics_dict, sharpe_30d, max_dd, per_symbol_perf, _, recent_trades_raw,
+        ) = await self.db.fan_out([
+            self.db.calculate_performance_metrics(version_id=self.version_id),
+            self.db.calculate_sharpe_ratio(days=30, version_id=self.version_id),
+            self.db.calculate_max_drawdown(version_id=self.version_id),
+            self.db.calculate_per_symbol_performance(version_id=self.version_id),
+            self.db.update_market_prices(market_prices),
+            self.db.get_completed_trades(limit=10, version_id=self.version_id),
+        ])
 
         # Create PerformanceMetrics object
-        from schemas import PerformanceMetrics
         performance = PerformanceMetrics(**perf_metrics_dict)
 
         scoreboard = Scoreboard(
@@ -677,13 +743,10 @@ class AgentWorker:
         # calculate minutes since start
         minutes_since_start = int((datetime.utcnow() - self.start_time).total_seconds() / 60)
 
-        # update market prices in database
-        await self.db.update_market_prices(market_prices)
-
-        # fetch recent completed trades (last 10) for current version only
-        recent_trades_raw = await self.db.get_completed_trades(limit=10, version_id=self.version_id)
+        # rows come from completed_trades() with float8 / text / timestamptz columns that
+        # already match the schema, so they're constructed without validation
         recent_trades = [
-            CompletedTrade(
+            CompletedTrade.model_construct(
                 symbol=trade["symbol"],
                 direction=trade["direction"],
                 entry_price=trade["entry_price"],
@@ -721,17 +784,21 @@ class AgentWorker:
         # For perpsim, use the sim_* values which are more accurate
         # For hyperliquid, calculate from trades
         if settings.trading_backend == "perpsim":
-            sim_realized_str = await self.db.get_metadata("sim_realized")
-            sim_fees_str = await self.db.get_metadata("sim_fees")
+            sim_meta = await self.db.get_metadata_many(["sim_realized", "sim_fees"])
+            sim_realized_str, sim_fees_str = sim_meta["sim_realized"], sim_meta["sim_fees"]
             realized_pnl = float(sim_realized_str) if sim_realized_str else 0.0
             fees_paid = float(sim_fees_str) if sim_fees_str else 0.0
         else:
-            realized_pnl = await self.db.calculate_realized_pnl()
-            fees_paid = await self.db.calculate_fees_paid()
+            realized_pnl, fees_paid = await self.db.fan_out([
+                self.db.calculate_realized_pnl(),
+                self.db.calculate_fees_paid(),
+            ])
 
         pnl_all_time = realized_pnl + fees_paid  # fees are already negative
-        await self.db.set_metadata("pnl_all_time", pnl_all_time)
-        await self.db.set_metadata("fees_paid_total", fees_paid)
+        await self.db.set_metadata_many({
+            "pnl_all_time": pnl_all_time,
+            "fees_paid_total": fees_paid,
+        })
         # max_dd calculation requires equity timeseries; placeholder here
         logger.info(f"scoreboard updated: pnl={pnl_all_time}, fees={fees_paid}")
 
@@ -3,15 +3,19 @@ coinbase exchange websocket feed for spot market data (public, no auth)
 """
 
 import asyncio
-import json
 import logging
 from datetime import datetime, timezone
 from typing import List, Callable
+import numpy as np
+import orjson
 import websockets
 from .coinbase_rest import fetch_historical_candles
 
 logger = logging.getLogger(__name__)
 
+# 1m candles kept per symbol (4 hours)
+CANDLE_1M_CAPACITY = 240
+
 
 class CoinbaseWebSocket:
     """
@@ -40,12 +44,13 @@ class CoinbaseWebSocket:
         self.running = False
         self.last_tick_time = datetime.utcnow()  # Track last message time
 
-        # ohlcv ring buffer for 1m candles (last 240 candles = 4 hours)
+        # ohlcv buffer for 1m candles: preallocated (240, 6) float64 per symbol, the first
+        # _candle_count[sym] rows filled oldest to newest, so reads are views, not copies
         # Pre-fill with historical data if provided
-        if prefilled_1m_candles:
-            self.candle_buffer = {sym: prefilled_1m_candles.get(sym, []) for sym in symbols}
-        else:
-            self.candle_buffer = {sym: [] for sym in symbols}
+        self.candle_buffer = {}
+        self._candle_count = {}
+        for sym in symbols:
+            self._new_candle_buffer(sym, (prefilled_1m_candles or {}).get(sym))
 
         # ohlcv ring buffer for 4h candles (last 50 candles)
         # Pre-fill with historical data if provided
@@ -67,7 +72,7 @@ class CoinbaseWebSocket:
                 "product_ids": self.symbols,
                 "channels": ["ticker"],
             }
-            await self.ws.send(json.dumps(subscribe_msg))
+            await self.ws.send(orjson.dumps(subscribe_msg).decode())
             logger.info(f"subscribed to ticker: {self.symbols}")
 
             self.running = True
@@ -92,9 +97,9 @@ class CoinbaseWebSocket:
                         break
 
                     try:
-                        data = json.loads(message)
+                        data = orjson.loads(message)
                         await self._handle_message(data)
-                    except json.JSONDecodeError as e:
+                    except orjson.JSONDecodeError as e:
                         logger.error(f"failed to parse ws message: {e}")
                     except Exception as e:
                         logger.error(f"error handling message: {e}")
@@ -167,36 +172,40 @@ class CoinbaseWebSocket:
 
         # truncate to 1m
         ts_minute = ts.replace(second=0, microsecond=0)
+        ts_ms = int(ts_minute.timestamp() * 1000)
 
-        buffer = self.candle_buffer.get(symbol, [])
+        if symbol not in self.candle_buffer:
+            self._new_candle_buffer(symbol)
+        buffer = self.candle_buffer[symbol]
+        n = self._candle_count[symbol]
 
         # check if we need to add a new candle
-        if not buffer or buffer[-1][0] != int(ts_minute.timestamp() * 1000):
-            # new candle - preserve volume from historical data if this is updating an existing candle
-            # otherwise set to 0 (live websocket doesn't provide volume)
-            candle = [
-                int(ts_minute.timestamp() * 1000),  # timestamp in ms
-                mid,  # open
-                mid,  # high
-                mid,  # low
-                mid,  # close
-                0.0,  # volume (not tracked in live feed)
-            ]
-            buffer.append(candle)
+        if n == 0 or buffer[n - 1, 0] != ts_ms:
+            # keep only last 240 candles (4 hours of 1m data): once full, slide the
+            # window down one row (once a minute) to make room at the end
+            if n == CANDLE_1M_CAPACITY:
+                buffer[:-1] = buffer[1:]
+                n -= 1
 
-            # keep only last 240 candles (4 hours of 1m data)
-            if len(buffer) > 240:
-                buffer.pop(0)
+            # new candle - volume is 0 (live websocket doesn't provide volume)
+            buffer[n] = (ts_ms, mid, mid, mid, mid, 0.0)
+            self._candle_count[symbol] = n + 1
 
         else:
             # update current candle (preserve existing volume)
-            candle = buffer[-1]
+            candle = buffer[n - 1]
             candle[2] = max(candle[2], mid)  # high
             candle[3] = min(candle[3], mid)  # low
             candle[4] = mid  # close
             # volume (index 5) is preserved from historical data
 
+    def _new_candle_buffer(self, symbol: str, candles: List[List[float]] = None):
+        """allocate the 1m buffer for symbol, seeded with the newest prefilled candles"""
+        buffer = np.zeros((CANDLE_1M_CAPACITY, 6))
+        rows = np.asarray(candles or [], dtype=np.float64).reshape(-1, 6)[-CANDLE_1M_CAPACITY:]
+        buffer[:len(rows)] = rows
         self.candle_buffer[symbol] = buffer
+        self._candle_count[symbol] = len(rows)
 
     def _update_4h_candle_buffer(self, symbol: str, bid: float, ask: float, ts: datetime):
         """
@@ -239,9 +248,11 @@ class CoinbaseWebSocket:
 
         self.candle_4h_buffer[symbol] = buffer
 
-    def get_candles(self, symbol: str) -> List[List[float]]:
-        """return last 240 1m candles for symbol"""
-        return self.candle_buffer.get(symbol, [])
+    def get_candles(self, symbol: str) -> np.ndarray:
+        """return last 240 1m candles for symbol as an (n, 6) view; copy before holding onto it"""
+        if symbol not in self.candle_buffer:
+            return np.empty((0, 6))
+        return self.candle_buffer[symbol][:self._candle_count[symbol]]
 
     def get_4h_candles(self, symbol: str) -> List[List[float]]:
         """return last 50 4h candles for symbol"""
@@ -19,6 +19,14 @@ MIGRATIONS = [
     "db/migrations/2025_10_27_add_observation_action_to_chat.sql",
     "db/migrations/2025_10_28_add_agent_versions.sql",
     "db/migrations/2025_11_06_add_trade_reasons.sql",
+    "db/migrations/2025_11_07_add_trade_covering_indexes.sql",
+    "db/migrations/2025_11_08_add_completed_trades_function.sql",
+    "db/migrations/2025_11_09_add_trade_symbol_ts_indexes.sql",
+    "db/migrations/2025_11_10_add_trades_fee_total.sql",
+    "db/migrations/2025_11_11_add_version_ts_indexes.sql",
+    "db/migrations/2025_11_12_add_version_perf_leaderboard_index.sql",
+    "db/migrations/2025_11_13_add_untagged_partial_indexes.sql",
+    "db/migrations/2025_11_14_add_trade_ts_id_covering_index.sql",
 ]
 
 
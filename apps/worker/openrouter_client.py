@@ -1,7 +1,7 @@
 import httpx
-import json
 import logging
-from typing import Dict
+import orjson
+from typing import Dict, Optional
 from schemas import Observation, Action
 from config import settings
 from prompt_formatter import format_observation
@@ -168,8 +168,8 @@ class OpenRouterClient:
         self.title = settings.openrouter_title
         self.http_client = httpx.AsyncClient(timeout=60.0)
 
-    async def get_action(self, observation: Observation) -> Dict:
-        """call qwen3-max and return parsed action json"""
+    async def get_action(self, observation: Observation, observation_str: Optional[str] = None) -> Dict:
+        """call qwen3-max and return parsed action json (observation_str: already formatted observation, if any)"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -180,7 +180,8 @@ class OpenRouterClient:
             headers["X-Title"] = self.title
 
         # Format observation into human-readable text
-        observation_str = format_observation(observation)
+        if observation_str is None:
+            observation_str = format_observation(observation)
 
         payload = {
             "model": self.model,
@@ -195,13 +196,13 @@ class OpenRouterClient:
         resp = await self.http_client.post(
             f"{self.base_url}/chat/completions",
             headers=headers,
-            json=payload,
+            content=orjson.dumps(payload),
         )
         if not resp.is_success:
             error_detail = resp.text
             raise Exception(f"OpenRouter error {resp.status_code}: {error_detail}")
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
         content = data["choices"][0]["message"]["content"]
 
         # Clean up markdown-wrapped JSON if present
@@ -214,7 +215,7 @@ class OpenRouterClient:
             content = content[:-3]  # Remove trailing ```
         content = content.strip()
 
-        return json.loads(content)
+        return orjson.loads(content)
 
     async def close(self):
         await self.http_client.aclose()
@@ -17,8 +17,9 @@ class Reconciler:
         """fetch account state and update database"""
         try:
             state = await self.hl_client.get_account_state()
-            await self._update_positions(state)
-            await self._update_equity(state)
+            async with self.db.transaction():
+                await self._update_positions(state)
+                await self._update_equity(state)
         except Exception as e:
             logger.error(f"reconcile failed: {e}")
 
@@ -0,0 +1,11 @@
+-- Migration: Indexes for per-symbol replay and ts range scans
+-- Date: 2025-11-09
+-- Description: completed_trades() walks trades in (symbol, ts, id) order;
+-- a brin index keeps ts range scans cheap on the append-only log.
+-- Not created concurrently because migrations run inside a transaction.
+
+create index if not exists idx_trades_symbol_ts on trades (symbol, ts, id);
+create index if not exists idx_trades_ts_brin on trades using brin (ts);
+
+-- superseded by idx_trades_symbol_ts
+drop index if exists idx_trades_symbol;
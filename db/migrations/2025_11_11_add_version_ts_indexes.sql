@@ -0,0 +1,12 @@
+-- Migration: Composite version indexes for per-version analytics
+-- Date: 2025-11-11
+-- Description: completed_trades(version_id) walks one version's fills in
+-- (symbol, ts, id) order; Sharpe / drawdown / version rollups read one
+-- version's equity curve in ts order. idx_chat_version already exists.
+
+create index if not exists idx_trades_version_symbol_ts on trades (version_id, symbol, ts, id);
+create index if not exists idx_equity_version_ts on equity_snapshots (version_id, ts) include (equity);
+
+-- superseded by the composite indexes above
+drop index if exists idx_trades_version;
+drop index if exists idx_equity_version;
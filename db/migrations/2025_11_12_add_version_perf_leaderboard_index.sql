@@ -0,0 +1,11 @@
+-- Migration: Leaderboard sort index on version_performance
+-- Date: 2025-11-12
+-- Description: get_version_leaderboard orders by sharpe_ratio then
+-- total_return_pct (both desc nulls last); one composite index serves the
+-- whole sort key.
+
+create index if not exists idx_version_perf_sharpe_return
+  on version_performance (sharpe_ratio desc nulls last, total_return_pct desc nulls last);
+
+-- superseded by the composite index above
+drop index if exists idx_version_perf_sharpe;
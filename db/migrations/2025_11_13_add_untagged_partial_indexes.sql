@@ -0,0 +1,9 @@
+-- Migration: Partial indexes on untagged rows
+-- Date: 2025-11-13
+-- Description: update_current_version_tags runs every cycle and only touches
+-- rows with version_id is null. Partial indexes keep that lookup proportional
+-- to the untagged rows (normally none) instead of the table size.
+
+create index if not exists idx_trades_untagged on trades (ts) where version_id is null;
+create index if not exists idx_equity_untagged on equity_snapshots (ts) where version_id is null;
+create index if not exists idx_chat_untagged on model_chat (ts) where version_id is null;